@@ -1,7 +1,10 @@
 from src.core.utils import logger
-from src.db.builder import build_database
 
 if __name__ == "__main__":
+    # 在主模块的 main 块中导入：解析 JSON 的工作进程会重新导入主模块，
+    # 放在顶层会让每个工作进程都加载句向量模型依赖的 torch
+    from src.db.builder import build_database
+
     try:
         logger.info("启动数据库构建流程...")
         build_database()
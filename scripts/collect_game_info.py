@@ -1,8 +1,11 @@
-import asyncio
 from pathlib import Path
 
-from markdownify import markdownify as md
-from utils import get_page_revid, get_page_text, logger
+from markdownify import MarkdownConverter
+from utils import get_page_revid, get_page_soup, logger, run
+
+MARKDOWN_CONVERTER = MarkdownConverter(
+    heading_style="atx", bullets="-", convert_links=True
+)
 
 
 async def fetch_and_save_game_info(revid=None):
@@ -21,12 +24,11 @@ async def fetch_and_save_game_info(revid=None):
     else:
         logger.warning(f"游戏信息文件 {game_info_path} 不存在，开始爬取游戏信息。")
         # 如果文件不存在，则需要爬取游戏信息
-        html = await get_page_text("蔚蓝档案")
-        md_text = md(html, heading_style="atx", bullets="-", convert_links=True)
-        with open(game_info_path, "w", encoding="utf-8") as f:
-            f.write(md_text)
+        soup = await get_page_soup("蔚蓝档案")
+        md_text = MARKDOWN_CONVERTER.convert_soup(soup) if soup is not None else ""
+        game_info_path.write_text(md_text, encoding="utf-8")
         logger.info(f"游戏信息已保存到 {game_info_path}。")
 
 
 if __name__ == "__main__":
-    asyncio.run(fetch_and_save_game_info())
+    run(fetch_and_save_game_info)
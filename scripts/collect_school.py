@@ -1,77 +1,142 @@
 import asyncio
-import json
+import shutil
 from pathlib import Path
 
-from markdownify import markdownify as md
+import aiofiles
+import orjson
+from collect_school_info import SCHOOL_INFO_PATH, iter_school_info, save_school_info
+from markdownify import MarkdownConverter
 from rich.progress import Progress
-from utils import get_page_revid, get_page_text, logger
+from utils import (
+    MAX_TITLES_PER_QUERY,
+    UNCHANGED,
+    fetch_page_soup,
+    get_pages_revid,
+    latest_local_files,
+    load_etags,
+    logger,
+    run,
+    save_etags,
+)
 
+# 同时处理页面的工作协程数量
+CONCURRENCY = 6
+# 待处理标题队列的容量，生产者领先消费者太多时会等待
+QUEUE_SIZE = 32
+
+MARKDOWN_CONVERTER = MarkdownConverter(
+    heading_style="atx", bullets="-", convert_links=True
+)
 
-async def main():
-    """主函数，爬取学校信息并保存为Markdown文件。"""
-    # 从本地文件中读取学生信息
-    school_info_path = (
-        Path(__file__).parents[1] / "data" / "schools" / "school_info.json"
-    )
-    if school_info_path.exists():
-        with open(school_info_path, "r", encoding="utf-8") as f:
-            school_info = json.load(f)
-        logger.info("学校信息已加载。")
-    else:
-        logger.warning(f"学校信息文件 {school_info_path} 不存在，开始爬取学校信息。")
-        # 如果文件不存在，则需要爬取学校信息
-        from collect_school_info import fetch_and_save_school_info
 
-        await fetch_and_save_school_info()
-        with open(school_info_path, "r", encoding="utf-8") as f:
-            school_info = json.load(f)
+async def iter_titles():
+    """产出待爬取的学校标题：本地已有列表时直接读取，否则边爬取分类边产出"""
+    if SCHOOL_INFO_PATH.exists():
+        school_info = orjson.loads(SCHOOL_INFO_PATH.read_bytes())
         logger.info("学校信息已加载。")
+        yield school_info
+        return
+    logger.warning(f"学校信息文件 {SCHOOL_INFO_PATH} 不存在，开始爬取学校信息。")
+    school_info = []
+    async for batch in iter_school_info():
+        school_info.extend(batch)
+        yield batch
+    save_school_info(school_info)
 
+
+async def main():
+    """主函数，爬取学校信息并保存为Markdown文件。"""
     output_dir = Path(__file__).parents[1] / "data" / "schools" / "markdown"
     output_dir.mkdir(parents=True, exist_ok=True)
+    # 本地已有的各页面最新版本，以及与其内容对应的 ETag
+    local_files = latest_local_files(output_dir)
+    etag_path = output_dir / "etag_cache.json"
+    etags = load_etags(etag_path)
 
-    school_info = school_info
-
+    revids = {}
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
     crawl_results = []
+    total = 0
 
-    with Progress() as progress:
-        task = progress.add_task("[cyan]保存学校markdown...", total=len(school_info))
-        for school in school_info:
-            try:
-                # 获取页面的最新修订版本号
-                revid = await get_page_revid(school)
-                output_path = output_dir / f"{school}_{revid}.md"
-                if output_path.exists():
-                    msg = f"{school} 的 revid={revid} 已存在，跳过更新。"
-                    logger.info(msg)
-                    crawl_results.append(
-                        {
-                            "title": school,
-                            "revid": revid,
-                            "status": "skipped",
-                            "msg": msg,
-                        }
-                    )
-                    progress.update(task, advance=1)
-                    await asyncio.sleep(2)
-                    continue
-                html = await get_page_text(school)
-                md_text = md(html, heading_style="atx", bullets="-", convert_links=True)
-                with open(output_path, "w", encoding="utf-8") as output_file:
-                    output_file.write(md_text)
-                msg = f"已保存 {school} 的wiki页面的 markdown 版本到 {output_path}"
+    async def producer():
+        nonlocal total
+        try:
+            async for titles in iter_titles():
+                # 每批标题先批量查询修订版本号（每次最多 50 个），再交给工作协程
+                for i in range(0, len(titles), MAX_TITLES_PER_QUERY):
+                    batch = titles[i : i + MAX_TITLES_PER_QUERY]
+                    revids.update(await get_pages_revid(batch))
+                    total += len(batch)
+                    progress.update(task, total=total)
+                    for school in batch:
+                        await queue.put(school)
+        finally:
+            # 每个工作协程收到一个 None 后退出
+            for _ in range(CONCURRENCY):
+                await queue.put(None)
+
+    async def worker():
+        while (school := await queue.get()) is not None:
+            crawl_results.append(await crawl(school))
+
+    async def crawl(school: str) -> dict:
+        try:
+            revid = revids.get(school)
+            if revid is None:
+                raise ValueError("未找到页面的修订版本号")
+            output_path = output_dir / f"{school}_{revid}.md"
+            if output_path.exists():
+                msg = f"{school} 的 revid={revid} 已存在，跳过更新。"
                 logger.info(msg)
-                crawl_results.append(
-                    {"title": school, "revid": revid, "status": "saved", "msg": msg}
-                )
-            except Exception as e:
-                msg = f"获取 {school} 的wiki页面时出错: {e}"
-                logger.error(msg)
-                crawl_results.append(
-                    {"title": school, "revid": None, "status": "failed", "msg": msg}
+                return {
+                    "title": school,
+                    "revid": revid,
+                    "status": "skipped",
+                    "msg": msg,
+                }
+            # 本地没有可沿用的旧版本时不发送条件请求
+            etag = etags.get(school) if school in local_files else None
+            soup, new_etag = await fetch_page_soup(school, etag=etag)
+            if soup is UNCHANGED:
+                # 服务器确认页面内容未变，沿用旧版本内容并记录为新的 revid
+                await asyncio.to_thread(
+                    shutil.copyfile, local_files[school][1], output_path
                 )
+                msg = f"{school} 的内容未变化，已沿用旧版本保存到 {output_path}"
+                logger.info(msg)
+                return {
+                    "title": school,
+                    "revid": revid,
+                    "status": "unchanged",
+                    "msg": msg,
+                }
+            # 直接转换已解析的页面，避免把 HTML 序列化后再解析一遍
+            md_text = MARKDOWN_CONVERTER.convert_soup(soup) if soup is not None else ""
+            # 写文件交给线程池，事件循环可以继续处理其他页面
+            async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
+                await f.write(md_text)
+            # 文件写入成功后才记录新的 ETag，失败时下次仍会完整获取页面
+            if new_etag:
+                etags[school] = new_etag
+            else:
+                # 新保存的内容与旧的 ETag 不再对应
+                etags.pop(school, None)
+            msg = f"已保存 {school} 的wiki页面的 markdown 版本到 {output_path}"
+            logger.info(msg)
+            return {"title": school, "revid": revid, "status": "saved", "msg": msg}
+        except Exception as e:
+            msg = f"获取 {school} 的wiki页面时出错: {e}"
+            logger.error(msg)
+            return {"title": school, "revid": None, "status": "failed", "msg": msg}
+        finally:
             progress.update(task, advance=1)
-            await asyncio.sleep(2)
+
+    with Progress() as progress:
+        # 总数随生产者产出的标题逐步确定
+        task = progress.add_task("[cyan]保存学校markdown...", total=None)
+        # 并发数由工作协程数量控制，请求频率由 utils 中所有请求共享的限速器控制
+        await asyncio.gather(producer(), *(worker() for _ in range(CONCURRENCY)))
+    save_etags(etag_path, etags)
 
     logger.info("====== 爬取结果汇总 ======")
     for r in crawl_results:
@@ -79,4 +144,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main)
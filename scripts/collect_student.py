@@ -1,10 +1,29 @@
 import asyncio
-import json
+import shutil
 from pathlib import Path
 
-from markdownify import markdownify as md
+import aiofiles
+import orjson
+from markdownify import MarkdownConverter
 from rich.progress import Progress
-from utils import get_page_revid, get_page_text, logger
+from utils import (
+    UNCHANGED,
+    fetch_page_soup,
+    get_page_revid,
+    get_pages_revid,
+    latest_local_files,
+    load_etags,
+    logger,
+    run,
+    save_etags,
+)
+
+# 同时处理的页面数量
+CONCURRENCY = 6
+
+MARKDOWN_CONVERTER = MarkdownConverter(
+    heading_style="atx", bullets="-", convert_links=True
+)
 
 
 async def main():
@@ -18,8 +37,7 @@ async def main():
         / f"students_info_{students_info_revid}.json"
     )
     if student_info_path.exists():
-        with open(student_info_path, "r", encoding="utf-8") as f:
-            student_info = json.load(f)
+        student_info = orjson.loads(student_info_path.read_bytes())
         logger.info("学生信息已加载。")
     else:
         logger.warning(f"学生信息文件 {student_info_path} 不存在，开始爬取学生信息。")
@@ -27,12 +45,15 @@ async def main():
         from collect_student_info import fetch_and_save_student_info
 
         await fetch_and_save_student_info()
-        with open(student_info_path, "r", encoding="utf-8") as f:
-            student_info = json.load(f)
+        student_info = orjson.loads(student_info_path.read_bytes())
         logger.info("学生信息已加载。")
 
     output_dir = Path(__file__).parents[1] / "data" / "students" / "markdown"
     output_dir.mkdir(parents=True, exist_ok=True)
+    # 本地已有的各页面最新版本，以及与其内容对应的 ETag
+    local_files = latest_local_files(output_dir)
+    etag_path = output_dir / "etag_cache.json"
+    etags = load_etags(etag_path)
 
     student_info = [
         student
@@ -40,57 +61,82 @@ async def main():
         if student.get("标题", "").find("页面不存在") == -1
     ]
 
-    crawl_results = []
+    # 批量获取所有页面的最新修订版本号，每次请求最多查询 50 个标题
+    revids = await get_pages_revid(
+        [student["标题"] for student in student_info if student.get("标题")]
+    )
 
-    with Progress() as progress:
-        task = progress.add_task("[cyan]保存学生markdown...", total=len(student_info))
-        for student in student_info:
-            # 获取相应学生的wiki页面
-            title = student.get("标题", "")
-            if title:
-                try:
-                    # 获取页面的最新修订版本号
-                    revid = await get_page_revid(title)
-                    output_path = output_dir / f"{title}_{revid}.md"
-                    if output_path.exists():
-                        msg = f"{title} 的 revid={revid} 已存在，跳过更新。"
-                        logger.info(msg)
-                        crawl_results.append(
-                            {
-                                "title": title,
-                                "revid": revid,
-                                "status": "skipped",
-                                "msg": msg,
-                            }
-                        )
-                        progress.update(task, advance=1)
-                        await asyncio.sleep(2)
-                        continue
-                    html = await get_page_text(title)
-                    md_text = md(
-                        html, heading_style="atx", bullets="-", convert_links=True
-                    )
-                    with open(output_path, "w", encoding="utf-8") as output_file:
-                        output_file.write(md_text)
-                    msg = f"已保存 {title} 的wiki页面的 markdown 版本到 {output_path}"
+    # 并发数由信号量控制，请求频率由 utils 中所有请求共享的限速器控制
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def crawl(student: dict) -> dict:
+        # 获取相应学生的wiki页面
+        title = student.get("标题", "")
+        if not title:
+            msg = "学生信息中没有有效的姓名，跳过该学生。"
+            logger.warning(msg)
+            progress.update(task, advance=1)
+            return {"title": title, "revid": None, "status": "invalid", "msg": msg}
+        async with sem:
+            try:
+                revid = revids.get(title)
+                if revid is None:
+                    raise ValueError("未找到页面的修订版本号")
+                output_path = output_dir / f"{title}_{revid}.md"
+                if output_path.exists():
+                    msg = f"{title} 的 revid={revid} 已存在，跳过更新。"
                     logger.info(msg)
-                    crawl_results.append(
-                        {"title": title, "revid": revid, "status": "saved", "msg": msg}
-                    )
-                except Exception as e:
-                    msg = f"获取 {title} 的wiki页面时出错: {e}"
-                    logger.error(msg)
-                    crawl_results.append(
-                        {"title": title, "revid": None, "status": "failed", "msg": msg}
+                    return {
+                        "title": title,
+                        "revid": revid,
+                        "status": "skipped",
+                        "msg": msg,
+                    }
+                # 本地没有可沿用的旧版本时不发送条件请求
+                etag = etags.get(title) if title in local_files else None
+                soup, new_etag = await fetch_page_soup(title, etag=etag)
+                if soup is UNCHANGED:
+                    # 服务器确认页面内容未变，沿用旧版本内容并记录为新的 revid
+                    await asyncio.to_thread(
+                        shutil.copyfile, local_files[title][1], output_path
                     )
-            else:
-                msg = "学生信息中没有有效的姓名，跳过该学生。"
-                logger.warning(msg)
-                crawl_results.append(
-                    {"title": title, "revid": None, "status": "invalid", "msg": msg}
+                    msg = f"{title} 的内容未变化，已沿用旧版本保存到 {output_path}"
+                    logger.info(msg)
+                    return {
+                        "title": title,
+                        "revid": revid,
+                        "status": "unchanged",
+                        "msg": msg,
+                    }
+                # 直接转换已解析的页面，避免把 HTML 序列化后再解析一遍
+                md_text = (
+                    MARKDOWN_CONVERTER.convert_soup(soup) if soup is not None else ""
                 )
-            progress.update(task, advance=1)
-            await asyncio.sleep(2)
+                # 写文件交给线程池，事件循环可以继续处理其他页面
+                async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
+                    await f.write(md_text)
+                # 文件写入成功后才记录新的 ETag，失败时下次仍会完整获取页面
+                if new_etag:
+                    etags[title] = new_etag
+                else:
+                    # 新保存的内容与旧的 ETag 不再对应
+                    etags.pop(title, None)
+                msg = f"已保存 {title} 的wiki页面的 markdown 版本到 {output_path}"
+                logger.info(msg)
+                return {"title": title, "revid": revid, "status": "saved", "msg": msg}
+            except Exception as e:
+                msg = f"获取 {title} 的wiki页面时出错: {e}"
+                logger.error(msg)
+                return {"title": title, "revid": None, "status": "failed", "msg": msg}
+            finally:
+                progress.update(task, advance=1)
+
+    with Progress() as progress:
+        task = progress.add_task("[cyan]保存学生markdown...", total=len(student_info))
+        tasks = [asyncio.create_task(crawl(student)) for student in student_info]
+        # gather 按提交顺序返回结果，便于汇总
+        crawl_results = await asyncio.gather(*tasks)
+    save_etags(etag_path, etags)
 
     logger.info("====== 爬取结果汇总 ======")
     for r in crawl_results:
@@ -98,4 +144,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main)
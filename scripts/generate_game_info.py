@@ -1,8 +1,7 @@
-import asyncio
-import json
 from pathlib import Path
 
 import mistune
+import orjson
 from mistune.plugins.formatting import strikethrough
 from mistune.plugins.table import table
 from utils import (
@@ -10,8 +9,29 @@ from utils import (
     extract_text_from_table,
     get_page_revid,
     logger,
+    run,
 )
 
+# mistune 解析器在构造时注册插件并编译规则，解析本身不保留状态，可复用
+MARKDOWN = mistune.create_markdown(renderer="ast", plugins=[table, strikethrough])
+
+
+def list_to_text(list_node):
+    """提取列表文本，每个列表项一行"""
+    items = []
+    for item in list_node.get("children", []):
+        if item.get("type") == "list_item":
+            items.append(extract_text_from_node(item).strip())
+    return "\n".join(items)
+
+
+# 块级节点类型到文本提取函数的映射，一次字典查找代替逐个比较类型
+BLOCK_TEXT_HANDLERS = {
+    "paragraph": lambda node: extract_text_from_node(node).strip(),
+    "list": list_to_text,
+    "table": extract_text_from_table,
+}
+
 
 def flatten_section_content(section_nodes):
     """将section下的内容合并为结构化内容（table转为文本）"""
@@ -23,20 +43,8 @@ def flatten_section_content(section_nodes):
             sub_title = extract_text_from_node(node).strip()
             current_sub = {"sub_title": sub_title, "content": []}
             result.append(current_sub)
-        elif node.get("type") in ("paragraph", "list", "table"):
-            text = None
-            if node.get("type") == "paragraph":
-                text = extract_text_from_node(node).strip()
-            elif node.get("type") == "list":
-                # 提取列表文本
-                items = []
-                for item in node.get("children", []):
-                    if item.get("type") == "list_item":
-                        items.append(extract_text_from_node(item).strip())
-                text = "\n".join(items)
-            elif node.get("type") == "table":
-                # 可用你已有的 extract_text_from_table
-                text = extract_text_from_table(node)
+        elif handler := BLOCK_TEXT_HANDLERS.get(node.get("type")):
+            text = handler(node)
             if text:
                 if current_sub:
                     current_sub["content"].append(text)
@@ -74,7 +82,10 @@ def parse_section_by_level(nodes, level):
     """递归按标题级别分组，level为当前分组的标题级别（如3/4/5）"""
     result = []
     current = None
-    for node in nodes:
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        i += 1
         if (
             node.get("type") == "heading"
             and node.get("attrs", {}).get("level") == level
@@ -83,18 +94,8 @@ def parse_section_by_level(nodes, level):
                 result.append(current)
             title = extract_text_from_node(node).strip()
             current = {"title": title, "content": []}
-        elif node.get("type") in ("paragraph", "list", "table"):
-            text = None
-            if node.get("type") == "paragraph":
-                text = extract_text_from_node(node).strip()
-            elif node.get("type") == "list":
-                items = []
-                for item in node.get("children", []):
-                    if item.get("type") == "list_item":
-                        items.append(extract_text_from_node(item).strip())
-                text = "\n".join(items)
-            elif node.get("type") == "table":
-                text = extract_text_from_table(node)
+        elif handler := BLOCK_TEXT_HANDLERS.get(node.get("type")):
+            text = handler(node)
             if text and current:
                 current["content"].append(text)
         elif (
@@ -102,13 +103,15 @@ def parse_section_by_level(nodes, level):
         ):
             # 递归处理下一级标题
             sub_nodes = [node]
-            idx = nodes.index(node) + 1
+            idx = i
             while idx < len(nodes) and not (
                 nodes[idx].get("type") == "heading"
                 and nodes[idx].get("attrs", {}).get("level") <= level
             ):
                 sub_nodes.append(nodes[idx])
                 idx += 1
+            # 下级标题下的节点已交给递归处理，直接跳过
+            i = idx
             subs = parse_section_by_level(sub_nodes, level + 1)
             if subs and current:
                 current.setdefault("subsections", []).extend(subs)
@@ -143,16 +146,21 @@ def extract_sections(ast, section_names):
 async def main():
     """主函数, 解析游戏信息文件为 Json。"""
 
-    # 从本地文件中读取游戏信息
-    game_info_revid = await get_page_revid("蔚蓝档案")
-    game_info_path = (
-        Path(__file__).parents[1] / "data" / "games" / f"game_info_{game_info_revid}.md"
-    )
-    game_info_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if game_info_path.exists():
-        logger.info("已存在游戏信息文件。")
+    # 优先使用本地已有的最新游戏信息文件，只有本地没有时才请求 API
+    game_dir = Path(__file__).parents[1] / "data" / "games"
+    game_dir.mkdir(parents=True, exist_ok=True)
+    local_files = {}
+    for path in game_dir.glob("game_info_*.md"):
+        revid = path.stem.removeprefix("game_info_")
+        if revid.isdecimal():
+            local_files[int(revid)] = path
+
+    if local_files:
+        game_info_path = local_files[max(local_files)]
+        logger.info(f"已存在游戏信息文件 {game_info_path}。")
     else:
+        game_info_revid = await get_page_revid("蔚蓝档案")
+        game_info_path = game_dir / f"game_info_{game_info_revid}.md"
         logger.warning(f"游戏信息文件 {game_info_path} 不存在，开始爬取游戏信息。")
         # 如果文件不存在，则需要爬取游戏信息
         from collect_game_info import fetch_and_save_game_info
@@ -161,8 +169,7 @@ async def main():
 
     # 解析 markdown 文件
     md_text = game_info_path.read_text(encoding="utf-8")
-    markdown = mistune.create_markdown(renderer="ast", plugins=[table, strikethrough])
-    ast = markdown(md_text)
+    ast = MARKDOWN(md_text)
 
     section_names = ["背景设定（世界观）", "游戏系统"]
     sections = extract_sections(ast, section_names)
@@ -176,9 +183,8 @@ async def main():
             structured[sec] = flatten_section_content(nodes)
     output_file = Path(__file__).parents[1] / "data" / "games" / "game_info.json"
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with output_file.open("w", encoding="utf-8") as f:
-        json.dump(structured, f, ensure_ascii=False, indent=4)
+    output_file.write_bytes(orjson.dumps(structured, option=orjson.OPT_INDENT_2))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main)
@@ -1,11 +1,26 @@
-import json
-import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import mistune
+import orjson
 from mistune.plugins.formatting import strikethrough
 from mistune.plugins.table import table
 from rich.progress import Progress
+from utils import extract_text_from_node, extract_text_from_table, latest_local_files
+
+# mistune 解析器在构造时注册插件并编译规则，解析本身不保留状态，可在所有文件间复用
+MARKDOWN = mistune.create_markdown(renderer="ast", plugins=[table, strikethrough])
+
+SECTION_NAMES = [
+    "简介",
+    "校内设施",
+    "社团及学生",
+    "学生",
+    "历史",
+    "概况",
+    "学校设施",
+    "社团、学生与其他势力",
+]
 
 FIELD_MAP = {
     "简介": "简介",
@@ -19,185 +34,150 @@ FIELD_MAP = {
     "基本资料": "基本资料",
 }
 
+# 统一后的标准字段，按 FIELD_MAP 中首次出现的顺序排列
+STD_KEYS = tuple(dict.fromkeys(FIELD_MAP.values()))
 
-def extract_text_from_node(node):
-    if node.get("type") == "text":
-        return node.get("raw", "")
-    if node.get("type") in ("strong", "emphasis", "link", "paragraph"):
-        return "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if node.get("type") == "image":
-        return node.get("attrs", {}).get("title", "") or "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if "children" in node:
-        return "".join(extract_text_from_node(child) for child in node["children"])
-    return ""
-
-
-def extract_text_from_table(table_node):
-    lines = []
-    for child in table_node.get("children", []):
-        if child.get("type") in ("table_head", "table_body"):
-            for row in child.get("children", []):
-                if row.get("type") == "table_row":
-                    cells = row.get("children", [])
-                    line = (
-                        "| "
-                        + " | ".join(
-                            extract_text_from_node(cell).strip() for cell in cells
-                        )
-                        + " |"
-                    )
-                    lines.append(line)
-    return "\n".join(lines)
-
-
-def extract_profile_table_from_ast(ast):
+
+def extract_profile_table(table_node):
     profile = {}
-    for node in ast:
-        if node.get("type") == "table":
-            for child in node.get("children", []):
-                if child.get("type") == "table_body":
-                    rows = child.get("children", [])
-                    for row in rows:
-                        if row.get("type") != "table_row":
-                            continue
-                        cells = row.get("children", [])
-                        if len(cells) < 2:
-                            continue
-                        key = extract_text_from_node(cells[0]).strip()
-                        value = extract_text_from_node(cells[1]).strip()
-                        # 跳过空行和表头
-                        if not key or key in ["基本资料"]:
-                            continue
-                        if key and value:
-                            profile[key] = value
-            break
+    for child in table_node.get("children", []):
+        if child.get("type") == "table_body":
+            rows = child.get("children", [])
+            for row in rows:
+                if row.get("type") != "table_row":
+                    continue
+                cells = row.get("children", [])
+                if len(cells) < 2:
+                    continue
+                key = extract_text_from_node(cells[0]).strip()
+                value = extract_text_from_node(cells[1]).strip()
+                # 跳过空行和表头
+                if not key or key in ["基本资料"]:
+                    continue
+                if key and value:
+                    profile[key] = value
     return profile
 
 
-def extract_sections(ast, section_names):
-    sections = {}
-    current_section = None
-    current_content = []
+def paragraph_texts(node):
+    text = extract_text_from_node(node).strip()
+    return [text] if text else []
+
+
+def list_texts(node):
+    return [
+        extract_text_from_node(item).strip()
+        for item in node.get("children", [])
+        if item.get("type") == "list_item"
+    ]
+
+
+def table_texts(node):
+    table_text = extract_text_from_table(node)
+    return [table_text] if table_text else []
+
+
+# 内容节点类型到文本列表提取函数的映射，一次字典查找代替逐个比较类型
+CONTENT_HANDLERS = {
+    "paragraph": paragraph_texts,
+    "list": list_texts,
+    "table": table_texts,
+}
+
+
+def walk_ast(ast, section_names):
+    """单次遍历AST：按二级标题分块并展开指定section的内容，同时提取第一个表格中的基本资料"""
+    structured = {}
+    profile = None
+    # 当前section的内容列表，不需要的section为None
+    result = None
+    # 当前三级标题对应的子块
+    current_sub = None
     for node in ast:
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 2:
-            if current_section and current_section in section_names:
-                sections[current_section] = list(current_content)
-            current_section = extract_text_from_node(node).strip()
-            current_content = []
-        else:
-            if current_section and current_section in section_names:
-                current_content.append(node)
-    if current_section and current_section in section_names:
-        sections[current_section] = list(current_content)
-    return sections
-
-
-def flatten_section_content(section_nodes):
-    result = []
-    for node in section_nodes:
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 3:
-            sub_title = extract_text_from_node(node).strip()
-            result.append({"sub_title": sub_title, "content": []})
-        elif node.get("type") == "paragraph":
-            text = extract_text_from_node(node).strip()
-            if text:
-                if result and isinstance(result[-1], dict) and "content" in result[-1]:
-                    result[-1]["content"].append(text)
-                else:
-                    result.append(text)
-        elif node.get("type") == "list":
-            items = []
-            for item in node.get("children", []):
-                if item.get("type") == "list_item":
-                    items.append(extract_text_from_node(item).strip())
-            if items:
-                if result and isinstance(result[-1], dict) and "content" in result[-1]:
-                    result[-1]["content"].extend(items)
+        node_type = node.get("type")
+        if node_type == "table" and profile is None:
+            profile = extract_profile_table(node)
+        if node_type == "heading":
+            level = node.get("attrs", {}).get("level")
+            if level == 2:
+                title = extract_text_from_node(node).strip()
+                if title in section_names:
+                    # 同名section以最后一次出现的内容为准
+                    result = structured[title] = []
                 else:
-                    result.extend(items)
-        elif node.get("type") == "table":
-            table_text = extract_text_from_table(node)
-            if table_text:
-                if result and isinstance(result[-1], dict) and "content" in result[-1]:
-                    result[-1]["content"].append(table_text)
-                else:
-                    result.append(table_text)
-    return result
+                    result = None
+                current_sub = None
+            elif level == 3 and result is not None:
+                sub_title = extract_text_from_node(node).strip()
+                current_sub = {"sub_title": sub_title, "content": []}
+                result.append(current_sub)
+            continue
+        if result is None:
+            continue
+        handler = CONTENT_HANDLERS.get(node_type)
+        if handler:
+            target = current_sub["content"] if current_sub else result
+            target.extend(handler(node))
+    return structured, profile or {}
+
+
+def unify(structured):
+    """将各section映射为标准字段，同类项合并，并保证所有标准字段都存在"""
+    unified = {k: [] for k in STD_KEYS}
+    unified["基本资料"] = {}
+    for k, v in structured.items():
+        std_k = FIELD_MAP.get(k, k)
+        if isinstance(v, list):
+            # 合并同类项
+            unified.setdefault(std_k, []).extend(v)
+        else:
+            unified[std_k] = v
+    return unified
+
+
+def process_file(md_file: Path, school_name: str) -> None:
+    """解析单个学校Markdown文件，并输出统一结构的JSON文件。"""
+    print(f"正在处理文件: {md_file.name}")
+    md_text = md_file.read_text(encoding="utf-8")
+    ast = MARKDOWN(md_text)
+    structured, profile = walk_ast(ast, SECTION_NAMES)
+    structured["基本资料"] = profile
+
+    output_file = md_file.parents[1] / "json" / f"{school_name}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    unified = unify(structured)
+    output_file.write_bytes(orjson.dumps(unified, option=orjson.OPT_INDENT_2))
 
 
 if __name__ == "__main__":
     md_path = Path(__file__).parents[1] / "data" / "schools" / "markdown"
-    md_files = list(md_path.glob("*.md"))
-    pattern = re.compile(r"^(?P<name>.+)_(?P<revid>\d+)\.md$")
-    latest_files = {}
-    for md_file in md_files:
-        m = pattern.match(md_file.name)
-        if not m:
-            continue
-        name = m.group("name")
-        revid = int(m.group("revid"))
-        if name not in latest_files or revid > latest_files[name][0]:
-            latest_files[name] = (revid, md_file)
-    md_files = [item[1] for item in latest_files.values()]
-    if not md_files:
+    # 单次遍历目录，每个文件只做一次字典查找，保留每个学校 revid 最大的文件
+    latest_files = latest_local_files(md_path)
+    if not latest_files:
         print("没有找到任何 .md 文件，请检查路径。")
         exit(1)
 
+    json_path = md_path.parent / "json"
+    names = []
+    md_files = []
+    for name, (_, md_file) in latest_files.items():
+        output_file = json_path / f"{name}.json"
+        # JSON 比 Markdown 新说明已是最新，无需重新解析
+        if (
+            output_file.exists()
+            and output_file.stat().st_mtime >= md_file.stat().st_mtime
+        ):
+            continue
+        names.append(name)
+        md_files.append(md_file)
+    if not md_files:
+        print("所有学校的 JSON 文件均已是最新。")
+        exit(0)
+
     with Progress() as progress:
         task = progress.add_task("[cyan]处理学校Markdown文件...", total=len(md_files))
-        for md_file in md_files:
-            print(f"正在处理文件: {md_file.name}")
-            md_text = md_file.read_text(encoding="utf-8")
-            markdown = mistune.create_markdown(
-                renderer="ast", plugins=[table, strikethrough]
-            )
-            ast = markdown(md_text)
-            section_names = [
-                "简介",
-                "校内设施",
-                "社团及学生",
-                "学生",
-                "历史",
-                "概况",
-                "学校设施",
-                "社团、学生与其他势力",
-            ]
-            sections = extract_sections(ast, section_names)
-            structured = {}
-            for sec, nodes in sections.items():
-                structured[sec] = flatten_section_content(nodes)
-            profile = extract_profile_table_from_ast(ast)
-            structured["基本资料"] = profile
-            m = pattern.match(md_file.name)
-            if not m:
-                print(f"文件名格式不正确: {md_file.name}")
-                continue
-            school_name = m.group("name")
-
-            output_file = md_file.parents[1] / "json" / f"{school_name}.json"
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-
-            unified = {}
-
-            for k, v in structured.items():
-                std_k = FIELD_MAP.get(k, k)
-                # 合并同类项
-                if (
-                    std_k in unified
-                    and isinstance(unified[std_k], list)
-                    and isinstance(v, list)
-                ):
-                    unified[std_k].extend(v)
-                else:
-                    unified[std_k] = v
-            # 保证所有标准字段都存在
-            for std_k in FIELD_MAP.values():
-                if std_k not in unified:
-                    unified[std_k] = [] if std_k != "基本资料" else {}
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(unified, f, ensure_ascii=False, indent=4)
-            progress.update(task, advance=1)
+        # 解析 AST 是纯 CPU 工作，按文件分发到多个进程以绕过 GIL
+        with ProcessPoolExecutor() as executor:
+            for _ in executor.map(process_file, md_files, names):
+                progress.update(task, advance=1)
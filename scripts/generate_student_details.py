@@ -1,133 +1,126 @@
-import json
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import mistune
+import orjson
 from mistune.plugins.formatting import strikethrough
 from mistune.plugins.table import table
 from rich.progress import Progress
-from utils import extract_text_from_node, extract_text_from_table, logger
+from utils import (
+    extract_text_from_node,
+    extract_text_from_table,
+    latest_local_files,
+    logger,
+)
+
+# mistune 解析器在构造时注册插件并编译规则，解析本身不保留状态，可在所有文件间复用
+MARKDOWN = mistune.create_markdown(renderer="ast", plugins=[table, strikethrough])
+
+SECTION_NAMES = ["简介", "人物设定", "人物经历", "角色相关"]
+
+# 节点没有 attrs 时使用的共享默认值，避免每次 get 都新建空字典
+_EMPTY: dict = {}
+
+# 人物名之间的分隔符（逗号、顿号），一次 split 代替先替换再分割
+_SEP_RE = re.compile(r"[、,]")
+# 含有这些字符的不是人物名（如“（关系说明）”“关系：”），单次扫描即可判断
+_EXCLUDED_CHARS = frozenset("）：")
 
 
 def extract_text_from_cell(cell):
-    """递归提取cell内所有文本"""
-    if "raw" in cell:
-        return cell["raw"]
-    if "children" in cell:
-        return "".join(extract_text_from_cell(child) for child in cell["children"])
-    return ""
+    """提取cell内所有文本（用显式栈代替递归，按文档顺序拼接）"""
+    out = []
+    stack = [cell]
+    while stack:
+        node = stack.pop()
+        if "raw" in node:
+            out.append(node["raw"])
+            continue
+        children = node.get("children")
+        if children:
+            # 逆序入栈，保证子节点按原顺序出栈
+            stack.extend(reversed(children))
+    return "".join(out)
 
 
 def extract_links_from_cell(cell) -> list[str]:
-    """递归提取cell内所有 link/text 的人物名"""
+    """提取cell内所有 link/text 的人物名（用显式栈代替递归）"""
     names = []
-    if cell.get("type") == "link":
-        # 只提取 link 的文本
-        for child in cell.get("children", []):
-            if child.get("type") == "text":
-                names.append(child.get("raw", "").strip())
-    elif cell.get("type") == "text":
-        # 逗号、顿号分隔的文本也可能有
-        for name in cell.get("raw", "").replace("、", ",").split(","):
-            name = name.strip()
-            if name:
-                names.append(name)
-    elif "children" in cell:
-        for child in cell["children"]:
-            names.extend(extract_links_from_cell(child))
+    stack = [cell]
+    while stack:
+        node = stack.pop()
+        node_type = node.get("type")
+        if node_type == "link":
+            # 只提取 link 的文本
+            for child in node.get("children", []):
+                if child.get("type") == "text":
+                    names.append(child.get("raw", "").strip())
+        elif node_type == "text":
+            # 逗号、顿号分隔的文本也可能有
+            for name in _SEP_RE.split(node.get("raw", "")):
+                name = name.strip()
+                if name:
+                    names.append(name)
+        else:
+            children = node.get("children")
+            if children:
+                stack.extend(reversed(children))
     return names
 
 
 def extract_profile_table_from_ast(ast):
     profile = {}
-    related_persons = []
-    for node in ast:
-        if node.get("type") == "table":
-            for child in node.get("children", []):
-                if child.get("type") == "table_body":
-                    rows = child.get("children", [])
-                    i = 0
-                    while i < len(rows):
-                        row = rows[i]
-                        if row.get("type") != "table_row":
-                            i += 1
-                            continue
-                        cells = row.get("children", [])
-                        key = (
-                            extract_text_from_cell(cells[0]).strip()
-                            if len(cells) > 0
-                            else ""
-                        )
-                        value = (
-                            extract_text_from_cell(cells[1]).strip()
-                            if len(cells) > 1
-                            else ""
-                        )
-                        # 跳过空行和表头
-                        if not key or key in ["学生档案", "基本资料"]:
-                            i += 1
-                            continue
-                        # 处理相关人物
-                        if key == "相关人物":
-                            # 下一行是具体人物
-                            if i + 1 < len(rows):
-                                next_row = rows[i + 1]
-                                next_cells = next_row.get("children", [])
-                                if next_cells:
-                                    related_persons = extract_links_from_cell(
-                                        next_cells[0]
-                                    )
-                                    # 过滤掉包含括号或冒号的名字
-                                    related_persons = [
-                                        person
-                                        for person in related_persons
-                                        if person.find("）") == -1
-                                        and person.find("：") == -1
-                                    ]
-                                    profile["相关人物"] = ",".join(related_persons)
-                                    profile["相关人物_list"] = related_persons
-                                i += 2
-                                continue
-                        # 普通字段
-                        if key and value:
-                            profile[key] = value
-                        i += 1
-            break
+    # 只解析第一个表格
+    table_node = next((node for node in ast if node.get("type") == "table"), None)
+    if table_node is None:
+        return profile
+    for child in table_node.get("children", []):
+        if child.get("type") != "table_body":
+            continue
+        # 用迭代器逐行前进，“相关人物”的下一行直接用 next 取出，无需下标运算
+        rows = iter(child.get("children", []))
+        for row in rows:
+            if row.get("type") != "table_row":
+                continue
+            cells = row.get("children", [])
+            key = extract_text_from_cell(cells[0]).strip() if len(cells) > 0 else ""
+            value = extract_text_from_cell(cells[1]).strip() if len(cells) > 1 else ""
+            # 跳过空行和表头
+            if not key or key in ["学生档案", "基本资料"]:
+                continue
+            # 处理相关人物，下一行是具体人物
+            if key == "相关人物":
+                next_row = next(rows, None)
+                if next_row is not None:
+                    next_cells = next_row.get("children", [])
+                    if next_cells:
+                        related_persons = extract_links_from_cell(next_cells[0])
+                        # 过滤掉包含括号或冒号的名字
+                        related_persons = [
+                            person
+                            for person in related_persons
+                            if _EXCLUDED_CHARS.isdisjoint(person)
+                        ]
+                        profile["相关人物_list"] = related_persons
+                    continue
+            # 普通字段
+            if value:
+                profile[key] = value
     return profile
 
 
-def extract_sections(ast, section_names):
-    """按二级标题分块，提取指定section内容"""
-    sections = {}
-    current_section = None
-    current_content = []
-    for node in ast:
-        # 识别二级标题
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 2:
-            # 保存上一个section
-            if current_section and current_section in section_names:
-                sections[current_section] = list(current_content)
-            # 新section
-            current_section = extract_text_from_node(node).strip()
-            current_content = []
-        else:
-            if current_section and current_section in section_names:
-                current_content.append(node)
-    # 保存最后一个section
-    if current_section and current_section in section_names:
-        sections[current_section] = list(current_content)
-    return sections
-
-
 def flatten_section_content(section_nodes):
     """将section下的内容合并为纯文本或结构化内容"""
     result = []
     for node in section_nodes:
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 3:
+        node_type = node.get("type")
+        level = node.get("attrs", _EMPTY).get("level")
+        if node_type == "heading" and level == 3:
             # 三级标题，作为子块
             sub_title = extract_text_from_node(node).strip()
             result.append({"sub_title": sub_title, "content": []})
-        elif node.get("type") == "paragraph":
+        elif node_type == "paragraph":
             text = extract_text_from_node(node).strip()
             if text:
                 # 放到最近的三级标题下，否则直接加到result
@@ -135,7 +128,7 @@ def flatten_section_content(section_nodes):
                     result[-1]["content"].append(text)
                 else:
                     result.append(text)
-        elif node.get("type") == "table":
+        elif node_type == "table":
             table_text = extract_text_from_table(node)
             if table_text:
                 if result and isinstance(result[-1], dict) and "content" in result[-1]:
@@ -152,8 +145,10 @@ def parse_game_data_section(ast):
     current_version = None
     current_content = []
     for node in ast:
+        node_type = node.get("type")
+        level = node.get("attrs", _EMPTY).get("level")
         # 找到“游戏数据”二级标题
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 2:
+        if node_type == "heading" and level == 2:
             title = extract_text_from_node(node).strip()
             if title == "游戏数据":
                 in_game_data = True
@@ -164,16 +159,16 @@ def parse_game_data_section(ast):
         if not in_game_data:
             continue
         # 三级标题作为版本名
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 3:
+        if node_type == "heading" and level == 3:
             if current_version and current_content:
                 game_data[current_version] = current_content
             current_version = extract_text_from_node(node).strip()
             current_content = []
-        elif node.get("type") == "paragraph":
+        elif node_type == "paragraph":
             text = extract_text_from_node(node).strip()
             if text:
                 current_content.append(text)
-        elif node.get("type") == "table":
+        elif node_type == "table":
             table_text = extract_text_from_table(node)
             if table_text:
                 current_content.append(table_text)
@@ -220,100 +215,129 @@ def extract_table_as_list(table_node):
             continue
 
         cells = row.get("children", [])
-        # 提取所有单元格的纯文本
-        row_data = [extract_text_from_node(cell).strip() for cell in cells]
-
-        # 跳过空行
-        if not any(row_data):
+        # 少于两列的行不是台词，无需提取文本
+        if len(cells) < 2:
             continue
 
-        # 更精确地识别表头行
-        if len(row_data) >= 2:
-            first_cell = row_data[0].lower()
-            second_cell = row_data[1].lower() if len(row_data) > 1 else ""
-
-            # 跳过表头行 - 检查多种可能的表头格式
-            if (
-                ("场合" in first_cell and "台词" in second_cell)
-                or ("学生台词与语音" in " ".join(row_data))
-                or (first_cell == "场合" and second_cell == "台词")
-                or (
-                    "标题" in first_cell
-                    and any("蔚蓝档案" in cell for cell in row_data)
-                )
-            ):
-                continue
+        # 先只提取前两列，场合和台词都为空的行不会被收录，直接跳过
+        occasion = extract_text_from_node(cells[0]).strip()
+        line_text = extract_text_from_node(cells[1]).strip()
+        if not occasion and not line_text:
+            continue
 
-            # 有效的数据行
-            occasion = row_data[0] if row_data[0] else ""
-            line_text = row_data[1] if len(row_data) > 1 else ""
+        # 跳过表头行 - 检查多种可能的表头格式
+        first_cell = occasion.lower()
+        second_cell = line_text.lower()
+        if "场合" in first_cell and "台词" in second_cell:
+            continue
+        # 其余列只在判断表头时用到
+        row_data = [occasion, line_text]
+        row_data.extend(extract_text_from_node(cell).strip() for cell in cells[2:])
+        if any("学生台词与语音" in cell for cell in row_data) or (
+            "标题" in first_cell and any("蔚蓝档案" in cell for cell in row_data)
+        ):
+            continue
 
-            # 只要有场合或台词内容就添加
-            if occasion or line_text:
-                result.append({"occasion": occasion, "line": line_text})
+        # 有效的数据行
+        result.append({"occasion": occasion, "line": line_text})
 
     return result
 
 
-def parse_quotes_section(ast):
-    """解析角色台词部分，更robust地处理各种表格布局"""
+# 角色台词所在的二级标题
+QUOTE_SECTION_NAMES = ["角色台词", "角色语音", "学生台词与语音"]
+
+
+def walk_ast(ast, section_names):
+    """单次遍历AST：按二级标题分块提取指定section，同时解析角色台词部分
+
+    Returns:
+        tuple[dict, dict]: section 名到节点列表的映射，以及版本名到台词列表的映射
+    """
+    sections = {}
+    # 当前section的节点列表，不需要的section为None
+    current_content = None
+
     quotes = {}
-    in_quotes = False
+    # 台词部分的状态：None 表示尚未进入，True 表示正在其中，False 表示已经离开
+    in_quotes = None
     current_version = "原始"  # 默认版本处理没有明确版本标题的情况
 
-    quote_section_names = ["角色台词", "角色语音", "学生台词与语音"]
-
     for node in ast:
-        # 找到"角色台词"二级标题
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 2:
+        node_type = node.get("type")
+        level = node.get("attrs", _EMPTY).get("level")
+        if node_type == "heading" and level == 2:
             title = extract_text_from_node(node).strip()
-            if any(name in title for name in quote_section_names):
-                in_quotes = True
-                # 初始化默认版本
-                if current_version not in quotes:
-                    quotes[current_version] = []
-                continue
-            elif in_quotes:
-                # 离开角色台词section
-                break
+            # 同名section以最后一次出现的内容为准
+            if title in section_names:
+                current_content = sections[title] = []
+            else:
+                current_content = None
+            # 只解析第一段连续的台词部分
+            if in_quotes is not False:
+                if any(name in title for name in QUOTE_SECTION_NAMES):
+                    in_quotes = True
+                    # 初始化默认版本
+                    quotes.setdefault(current_version, [])
+                elif in_quotes:
+                    # 离开角色台词section
+                    in_quotes = False
+            continue
+
+        if current_content is not None:
+            current_content.append(node)
 
         if not in_quotes:
             continue
-
         # 三级标题作为版本名
-        if node.get("type") == "heading" and node.get("attrs", {}).get("level") == 3:
+        if node_type == "heading" and level == 3:
             current_version = extract_text_from_node(node).strip()
-            if current_version not in quotes:
-                quotes[current_version] = []
-        elif node.get("type") == "table":
-            # 确保当前版本存在
-            if current_version not in quotes:
-                quotes[current_version] = []
+            quotes.setdefault(current_version, [])
+        elif node_type == "table":
             # 解析表格并添加到当前版本
-            table_quotes = extract_table_as_list(node)
-            quotes[current_version].extend(table_quotes)
+            quotes.setdefault(current_version, []).extend(extract_table_as_list(node))
+
+    return sections, quotes
 
-    return quotes
+
+def process_file(md_file: Path, student_name: str) -> None:
+    """解析单个学生Markdown文件，并输出JSON文件。"""
+    logger.info(f"正在处理文件: {md_file.name}")
+    md_text = md_file.read_text(encoding="utf-8")
+    md_text = md_text.replace(
+        "| 学生台词与语音 | | | |\n| --- | --- | --- | --- |",
+        "| 学生台词与语音 | | |\n| --- | --- | --- |",
+    )
+
+    ast = MARKDOWN(md_text)
+
+    sections, quotes = walk_ast(ast, SECTION_NAMES)
+
+    # 展开内容
+    structured = {}
+    for sec, nodes in sections.items():
+        structured[sec] = flatten_section_content(nodes)
+
+    profile = extract_profile_table_from_ast(ast)
+    structured["学生档案"] = profile
+
+    # TODO: 解析游戏数据部分
+    # game_data = parse_game_data_section(ast)
+    # structured['游戏数据'] = game_data
+
+    structured["角色台词"] = quotes
+
+    output_file = md_file.parents[1] / "json" / f"{student_name}.json"
+    output_file.write_bytes(orjson.dumps(structured, option=orjson.OPT_INDENT_2))
 
 
 if __name__ == "__main__":
     md_path = Path(__file__).parents[1] / "data" / "students" / "markdown"
-    # 寻找 md_path 下的所有 .md 文件
-    md_files = list(md_path.glob("*.md"))
-    # 匹配“学生名_revid.md”，如“陆八魔亚瑠_123456.md”
-    pattern = re.compile(r"^(?P<name>.+)_(?P<revid>\d+)\.md$")
-    latest_files = {}
-    for md_file in md_files:
-        m = pattern.match(md_file.name)
-        if not m:
-            continue
-        name = m.group("name")
-        revid = int(m.group("revid"))
-        # 只保留revid最大的文件
-        if name not in latest_files or revid > latest_files[name][0]:
-            latest_files[name] = (revid, md_file)
-
-    # 只保留最大revid的md文件
+    # 文件名格式为“学生名_revid.md”，如“陆八魔亚瑠_123456.md”，只保留revid最大的文件
+    latest_files = latest_local_files(md_path)
+    # 跳过初音未来
+    latest_files.pop("初音未来", None)
+    names = list(latest_files)
     md_files = [item[1] for item in latest_files.values()]
     if not md_files:
         logger.error("没有找到任何 .md 文件，请检查路径。")
@@ -321,47 +345,7 @@ if __name__ == "__main__":
 
     with Progress() as progress:
         task = progress.add_task("[cyan]处理学生Markdown文件...", total=len(md_files))
-        # 处理所有 .md 文件
-        for md_file in md_files:
-            logger.info(f"正在处理文件: {md_file.name}")
-            md_text = md_file.read_text(encoding="utf-8")
-            md_text = md_text.replace(
-                "| 学生台词与语音 | | | |\n| --- | --- | --- | --- |",
-                "| 学生台词与语音 | | |\n| --- | --- | --- |",
-            )
-
-            markdown = mistune.create_markdown(
-                renderer="ast", plugins=[table, strikethrough]
-            )
-            ast = markdown(md_text)
-
-            section_names = ["简介", "人物设定", "人物经历", "角色相关"]
-            sections = extract_sections(ast, section_names)
-
-            # 展开内容
-            structured = {}
-            for sec, nodes in sections.items():
-                structured[sec] = flatten_section_content(nodes)
-
-            profile = extract_profile_table_from_ast(ast)
-            structured["学生档案"] = profile
-
-            # TODO: 解析游戏数据部分
-            # game_data = parse_game_data_section(ast)
-            # structured['游戏数据'] = game_data
-
-            quotes = parse_quotes_section(ast)
-            structured["角色台词"] = quotes
-
-            m = pattern.match(md_file.name)
-            if not m:
-                logger.error(f"文件名格式不正确: {md_file.name}")
-                continue
-            student_name = m.group("name")
-            if student_name == "初音未来":
+        # 解析 AST 是纯 CPU 工作，按文件分发到多个进程以绕过 GIL
+        with ProcessPoolExecutor() as executor:
+            for _ in executor.map(process_file, md_files, names, chunksize=4):
                 progress.update(task, advance=1)
-                continue  # 跳过初音未来
-            output_file = md_file.parents[1] / "json" / f"{student_name}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(structured, f, ensure_ascii=False, indent=4)
-            progress.update(task, advance=1)
@@ -1,72 +1,126 @@
+import asyncio
 import logging
+import os
+from pathlib import Path
 
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from async_lru import alru_cache
 from bs4 import BeautifulSoup
 from rich.logging import RichHandler
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
 
+API_URL = "https://moegirl.icu/api.php"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+HEADERS = {"User-Agent": USER_AGENT}
+
+# MediaWiki 对匿名用户单次查询最多接受 50 个标题
+MAX_TITLES_PER_QUERY = 50
+
+# 节点没有 attrs 时使用的共享默认值，避免每次 get 都新建空字典
+_EMPTY: dict = {}
+
+# 所有 API 请求共享的令牌桶限速器（每分钟 100 个请求），请求完成即可让出配额
+RATE = AsyncLimiter(100, 60)
+
+# 条件请求命中（HTTP 304）时 fetch_page_soup 返回的哨兵值
+UNCHANGED = "UNCHANGED"
+
+# 所有爬虫共享同一个客户端：复用连接池，并通过 HTTP/2 在单个 TLS 连接上多路复用请求。
+# 首次使用时才创建，只导入解析工具函数的进程（如 generate_* 的工作进程）不会创建客户端
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """获取共享的 HTTP 客户端，不存在时创建"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=20.0,
+            headers=HEADERS,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+    return _client
+
+
+def run(main):
+    """运行异步入口函数，并在结束后关闭共享的 HTTP 客户端。
+
+    Args:
+        main: 无参数的异步函数。
+    """
+
+    async def runner():
+        global _client
+        try:
+            return await main()
+        finally:
+            if _client is not None:
+                await _client.aclose()
+                _client = None
+
+    return asyncio.run(runner())
+
+
+# 页面中需要去除的模板、导航等元素
+NOISE_SELECTOR = ", ".join(
+    [
+        ".infoBox",
+        ".mobile-noteTA-0",
+        ".toc",
+        ".navbox.largeNavbox",
+        ".mw-editsection-bracket",
+        ".notice.dablink",
+    ]
+)
+
 
 def clean_html(html):
-    soup = BeautifulSoup(html, "html.parser")
+    """清理HTML字符串，返回清理后的HTML字符串"""
+    return str(clean_soup(BeautifulSoup(html, "lxml")))
 
-    for h2 in soup.find_all("h2"):
-        headline_span = h2.find("span", class_="mw-headline")
-        if headline_span:
-            # 用 headline span 里的纯文本替换 h2 的全部内容
-            h2.string = headline_span.get_text(strip=True)
-    for h3 in soup.find_all("h3"):
-        headline_span = h3.find("span", class_="mw-headline")
+
+def clean_soup(soup):
+    """原地清理已解析的页面，去除标题编辑链接、脚本样式和模板导航等无关内容"""
+    for heading in soup.find_all(["h2", "h3"]):
+        headline_span = heading.find("span", class_="mw-headline")
         if headline_span:
-            # 用 headline span 里的纯文本替换 h3 的全部内容
-            h3.string = headline_span.get_text(strip=True)
+            # 用 headline span 里的纯文本替换标题的全部内容
+            heading.string = headline_span.get_text(strip=True)
 
     # 去除所有 <script> 和 <style> 标签
     for tag in soup(["script", "style", "link"]):
         tag.decompose()
 
-    # 去除模板、导航等无关内容
-    for cls in [
-        "infoBox",
-        "mobile-noteTA-0",
-        "toc",
-        "navbox largeNavbox",
-        "mw-editsection-bracket",
-        "notice dablink",
-    ]:
-        for tag in soup.find_all(class_=cls):
-            tag.decompose()
+    # 去除模板、导航等无关内容，一次选择器查询代替逐个类名遍历
+    for tag in soup.select(NOISE_SELECTOR):
+        tag.decompose()
 
-    # 返回清理后的 HTML
-    return str(soup)
+    return soup
 
 
 def extract_text_from_node(node):
-    """递归提取节点内所有文本"""
-    if node.get("type") == "text":
-        return node.get("raw", "")
-    if node.get("type") == "strong":
-        return "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if node.get("type") == "emphasis":
-        return "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if node.get("type") == "link":
-        return "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if node.get("type") == "paragraph":
-        return "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if node.get("type") == "image":
-        return node.get("attrs", {}).get("title", "") or "".join(
-            extract_text_from_node(child) for child in node.get("children", [])
-        )
-    if "children" in node:
-        return "".join(extract_text_from_node(child) for child in node["children"])
-    return ""
+    """提取节点内所有文本（用显式栈代替递归，按文档顺序拼接）"""
+    out = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        node_type = current.get("type")
+        if node_type == "text":
+            out.append(current.get("raw", ""))
+            continue
+        if node_type == "image":
+            title = current.get("attrs", _EMPTY).get("title", "")
+            if title:
+                out.append(title)
+                continue
+        children = current.get("children")
+        if children:
+            # 逆序入栈，保证子节点按原顺序出栈
+            stack.extend(reversed(children))
+    return "".join(out)
 
 
 def extract_text_from_table(table_node):
@@ -88,6 +142,8 @@ def extract_text_from_table(table_node):
     return "\n".join(lines)
 
 
+# 同一进程内修订版本号不会变化，缓存结果以免重复请求同一页面
+@alru_cache(maxsize=512)
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_fixed(5),
@@ -95,7 +151,6 @@ def extract_text_from_table(table_node):
 )
 async def get_page_revid(title: str) -> int:
     """获取指定页面的修订版本号"""
-    url = "https://moegirl.icu/api.php"
     params = {
         "action": "query",
         "titles": title,
@@ -103,14 +158,61 @@ async def get_page_revid(title: str) -> int:
         "rvprop": "ids",
         "format": "json",
     }
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+    async with RATE:
+        resp = await get_client().get(API_URL, params=params)
+    data = resp.json()
+    page = next(iter(data["query"]["pages"].values()))
+    return page["revisions"][0]["revid"]
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_fixed(5),
+    retry=retry_if_exception_type((httpx.ConnectTimeout, httpx.RequestError)),
+)
+async def _query_pages_revid(titles: list[str]) -> dict[str, int]:
+    """使用一次 titles=A|B|C 多页面查询获取一批页面的修订版本号"""
+    params = {
+        "action": "query",
+        "titles": "|".join(titles),
+        "prop": "revisions",
+        "rvprop": "ids",
+        "format": "json",
+        "formatversion": 2,
     }
-    async with httpx.AsyncClient() as ctx:
-        resp = await ctx.get(url, params=params, headers=headers, timeout=20.0)
+    revids = {}
+    while True:
+        async with RATE:
+            resp = await get_client().get(API_URL, params=params)
         data = resp.json()
-        page = next(iter(data["query"]["pages"].values()))
-        return page["revisions"][0]["revid"]
+        query = data.get("query", {})
+        # API 会规范化标题（如下划线转空格），需要映射回调用方传入的标题
+        normalized = {n["to"]: n["from"] for n in query.get("normalized", [])}
+        for page in query.get("pages", []):
+            revisions = page.get("revisions")
+            # 不存在或无效的页面没有 revisions，直接跳过
+            if not revisions:
+                continue
+            title = normalized.get(page["title"], page["title"])
+            revids[title] = revisions[0]["revid"]
+        if "continue" not in data:
+            return revids
+        params.update(data["continue"])
+
+
+async def get_pages_revid(titles: list[str]) -> dict[str, int]:
+    """批量获取多个页面的修订版本号
+
+    Args:
+        titles (list[str]): 页面标题列表
+
+    Returns:
+        dict[str, int]: 标题到修订版本号的映射，不存在的页面不会出现在结果中
+    """
+    revids = {}
+    for i in range(0, len(titles), MAX_TITLES_PER_QUERY):
+        revids.update(await _query_pages_revid(titles[i : i + MAX_TITLES_PER_QUERY]))
+    return revids
 
 
 @retry(
@@ -118,60 +220,137 @@ async def get_page_revid(title: str) -> int:
     wait=wait_fixed(5),
     retry=retry_if_exception_type((httpx.ConnectTimeout, httpx.RequestError)),
 )
-async def get_page_text(title: str, redirect_count: int = 0) -> str:
-    """获取指定页面的HTML内容，并自动处理重定向。
+async def fetch_page_soup(
+    title: str, etag: str | None = None, redirect_count: int = 0
+) -> tuple[BeautifulSoup | str | None, str | None]:
+    """获取指定页面并解析为清理后的 BeautifulSoup 对象，并自动处理重定向。
+
+    重定向检查、清理和后续的 Markdown 转换共用同一次解析结果。
+    响应中的 ETag 只返回给调用方，由调用方在页面内容成功保存后再写入缓存，
+    避免转换或写文件失败时缓存了与本地文件不一致的 ETag。
 
     Args:
         title (str): 页面标题
+        etag (str | None, optional): 本地已保存版本的 ETag。传入时会发送
+            If-None-Match 条件请求. Defaults to None.
         redirect_count (int, optional): 当前重定向次数，用于防止无限循环. Defaults to 0.
 
     Returns:
-        str: 清理后的HTML字符串
+        tuple[BeautifulSoup | str | None, str | None]: (清理后的页面, 响应的 ETag)。
+            服务器返回 304 时页面为 UNCHANGED；无法获取内容时页面为 None
     """
 
-    url = "https://moegirl.icu/api.php"
     params = {
         "action": "parse",
         "page": title,
         "format": "json",
     }
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    }
-    async with httpx.AsyncClient() as ctx:
-        try:
-            resp = await ctx.get(url, params=params, headers=headers, timeout=20.0)
-            logger.info(f"爬取页面: {title} - 状态码: {resp.status_code}")
-            data = resp.json()
-            html = data["parse"]["text"]["*"]
-
-            if "parse" not in data or "text" not in data["parse"]:
-                logger.warning(
-                    f"页面 '{title}' 的 API 响应格式不正确，缺少 'parse' 或 'text' 键。"
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    try:
+        async with RATE:
+            resp = await get_client().get(API_URL, params=params, headers=headers)
+        logger.info(f"爬取页面: {title} - 状态码: {resp.status_code}")
+        if resp.status_code == httpx.codes.NOT_MODIFIED:
+            return UNCHANGED, None
+        data = resp.json()
+        html = data["parse"]["text"]["*"]
+
+        if "parse" not in data or "text" not in data["parse"]:
+            logger.warning(
+                f"页面 '{title}' 的 API 响应格式不正确，缺少 'parse' 或 'text' 键。"
+            )
+            return None, None
+
+        # 解析HTML以检查重定向（lxml 基于 libxml2，比纯 Python 的 html.parser 快得多）
+        soup = BeautifulSoup(html, "lxml")
+        redirect_div = soup.find("div", class_="redirectMsg")
+
+        if redirect_div:
+            redirect_link = redirect_div.find("a")
+            if redirect_link and redirect_link.get("title"):
+                new_title = redirect_link.get("title")
+                logger.info(f"页面 '{title}' 重定向到 '{new_title}'，正在跟随...")
+                # 递归调用自身以获取新页面的内容
+                # 本地缓存的 ETag 对应原标题，重定向目标不发送条件请求，
+                # 也不返回 ETag：重定向页本身不变不代表目标页面不变
+                soup, _ = await fetch_page_soup(
+                    new_title, redirect_count=redirect_count + 1
                 )
-                return ""
-
-            # 解析HTML以检查重定向
-            soup = BeautifulSoup(html, "html.parser")
-            redirect_div = soup.find("div", class_="redirectMsg")
-
-            if redirect_div:
-                redirect_link = redirect_div.find("a")
-                if redirect_link and redirect_link.get("title"):
-                    new_title = redirect_link.get("title")
-                    logger.info(f"页面 '{title}' 重定向到 '{new_title}'，正在跟随...")
-                    # 递归调用自身以获取新页面的内容
-                    return await get_page_text(new_title, redirect_count + 1)
-                else:
-                    logger.warning(f"在页面 '{title}' 上找到重定向，但无法提取新标题。")
-                    return ""
-            return clean_html(html)
-        except httpx.ConnectTimeout:
-            logger.error(f"请求超时: {title}")
-            raise
-        except Exception as e:
-            logger.error(f"请求失败: {title} - {e}")
-            raise
+                return soup, None
+            else:
+                logger.warning(f"在页面 '{title}' 上找到重定向，但无法提取新标题。")
+                return None, None
+        return clean_soup(soup), resp.headers.get("ETag")
+    except httpx.ConnectTimeout:
+        logger.error(f"请求超时: {title}")
+        raise
+    except Exception as e:
+        logger.error(f"请求失败: {title} - {e}")
+        raise
+
+
+async def get_page_soup(title: str) -> BeautifulSoup | None:
+    """获取指定页面并解析为清理后的 BeautifulSoup 对象，并自动处理重定向。
+
+    Args:
+        title (str): 页面标题
+
+    Returns:
+        BeautifulSoup | None: 清理后的页面，无法获取内容时返回 None
+    """
+    soup, _ = await fetch_page_soup(title)
+    return soup
+
+
+async def get_page_text(title: str) -> str:
+    """获取指定页面的HTML内容，并自动处理重定向。
+
+    Args:
+        title (str): 页面标题
+
+    Returns:
+        str: 清理后的HTML字符串
+    """
+    soup = await get_page_soup(title)
+    return str(soup) if soup is not None else ""
+
+
+def load_etags(path: Path) -> dict[str, str]:
+    """读取持久化的 ETag 缓存，文件不存在时返回空字典"""
+    if not path.exists():
+        return {}
+    return orjson.loads(path.read_bytes())
+
+
+def save_etags(path: Path, etags: dict[str, str]) -> None:
+    """保存 ETag 缓存"""
+    path.write_bytes(orjson.dumps(etags, option=orjson.OPT_INDENT_2))
+
+
+def latest_local_files(directory: Path) -> dict[str, tuple[int, Path]]:
+    """扫描“标题_revid.md”格式的文件，返回每个标题修订版本号最大的文件
+
+    Args:
+        directory (Path): Markdown 文件所在目录
+
+    Returns:
+        dict[str, tuple[int, Path]]: 标题到 (revid, 文件路径) 的映射
+    """
+    latest = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".md"):
+                continue
+            name, _, revid = entry.name[:-3].rpartition("_")
+            if not name or not revid.isdecimal():
+                continue
+            revid = int(revid)
+            current = latest.get(name)
+            if current is None or revid > current[0]:
+                latest[name] = (revid, Path(entry.path))
+    return latest
 
 
 logging.basicConfig(
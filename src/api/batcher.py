@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from ..core.utils import logger
+
+# 单个批次最多合并的查询数量
+MAX_BATCH = 32
+# 收到第一个查询后，最多再等待多久以凑满批次（毫秒）
+MAX_WAIT_MS = 5
+
+
+class EmbeddingBatcher:
+    """将并发请求中的查询文本合并为一个批次，一次前向计算完成编码。
+
+    每个请求把 (查询, Future) 放入队列，后台任务在 MAX_WAIT_MS 的时间窗口内
+    最多收集 MAX_BATCH 个查询，在专用的单线程执行器中调用一次 model.encode，
+    再把结果分发给各个 Future。
+    批次本身是串行处理的，单线程即可；模型内部的矩阵运算仍会使用多个 CPU 核心。
+    """
+
+    def __init__(
+        self,
+        model: SentenceTransformer,
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: float = MAX_WAIT_MS,
+    ):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        """启动后台批处理任务，需要在事件循环中调用。"""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台批处理任务。"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def encode(self, query: str) -> np.ndarray:
+        """提交一个查询并等待其所在批次编码完成。"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[str, asyncio.Future]]:
+        """等待第一个查询，然后在时间窗口内继续收集，直到凑满批次或超时。"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # 跳过已被取消的请求（如客户端断开）
+            batch = [(query, future) for query, future in batch if not future.done()]
+            if not batch:
+                continue
+            queries = [query for query, _ in batch]
+            try:
+                # 编码是阻塞的 CPU/GPU 计算，放到专用线程中执行，避免阻塞事件循环
+                vectors = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    partial(
+                        self.model.encode,
+                        queries,
+                        batch_size=len(queries),
+                        convert_to_tensor=False,
+                    ),
+                )
+            except Exception as e:
+                logger.error(f"批量编码 {len(queries)} 个查询失败: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
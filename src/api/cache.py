@@ -0,0 +1,137 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# 精确缓存最多保存的搜索结果数量
+EXACT_CACHE_SIZE = 1024
+# 语义缓存最多保存的查询向量数量
+SEMANTIC_CACHE_SIZE = 256
+# 缓存结果的有效期（秒）
+CACHE_TTL = 300
+# 语义缓存命中所需的最小余弦相似度
+SIMILARITY_THRESHOLD = 0.95
+
+
+class SearchCache:
+    """搜索结果缓存，由精确缓存和语义缓存两级组成。
+
+    精确缓存以 (集合, 查询, top_k, 过滤表达式, 输出字段) 为键，命中时连查询编码也可以跳过；
+    语义缓存保存最近的查询向量，新查询与某个缓存查询的余弦相似度不低于阈值，
+    且其余搜索参数相同时，直接复用其结果，跳过 Milvus 搜索。
+
+    语义缓存的向量归一化后存放在预分配的矩阵中，按环形缓冲区覆盖最旧的条目，
+    查找只需一次矩阵向量乘法，不必每次重新堆叠向量。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = EXACT_CACHE_SIZE,
+        semantic_size: int = SEMANTIC_CACHE_SIZE,
+        ttl: float = CACHE_TTL,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.maxsize = maxsize
+        self.semantic_size = semantic_size
+        self.ttl = ttl
+        self.threshold = threshold
+        # 键 -> (过期时间, 结果)
+        self._exact: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+        # 归一化的查询向量矩阵，首次写入时按向量维度分配
+        self._matrix: np.ndarray | None = None
+        # 各槽位搜索参数的哈希值，用于向量化地筛选参数相同的条目
+        self._param_hashes = np.zeros(semantic_size, dtype=np.int64)
+        # 各槽位的过期时间，0 表示空槽位
+        self._expires = np.zeros(semantic_size)
+        # 各槽位的 (搜索参数, 结果)
+        self._entries: list[tuple[tuple, list] | None] = [None] * semantic_size
+        # 下一个写入的槽位
+        self._next = 0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> list | None:
+        """按精确键查找缓存结果。"""
+        entry = self._exact.get(key)
+        if entry is not None:
+            expires, results = entry
+            if expires > time.monotonic():
+                self._exact.move_to_end(key)
+                self.hits += 1
+                return results
+            del self._exact[key]
+        return None
+
+    def get_similar(self, params: tuple, vector: np.ndarray) -> list | None:
+        """查找搜索参数相同、查询向量足够相似的缓存结果。"""
+        if self._matrix is not None:
+            mask = (self._expires > time.monotonic()) & (
+                self._param_hashes == hash(params)
+            )
+            if mask.any():
+                # 缓存的向量已归一化，矩阵乘法即得到余弦相似度
+                sims = np.where(mask, self._matrix @ _normalize(vector), -np.inf)
+                best = int(sims.argmax())
+                entry = self._entries[best]
+                # 再次比较参数本身，排除哈希碰撞
+                if sims[best] >= self.threshold and entry[0] == params:
+                    self.semantic_hits += 1
+                    return entry[1]
+        self.misses += 1
+        return None
+
+    def record_miss(self):
+        """记录一次不查找语义缓存的未命中（精确缓存未命中后直接搜索）。"""
+        self.misses += 1
+
+    def put_exact(self, key: tuple, results: list) -> float:
+        """只写入精确缓存，返回条目的过期时间。
+
+        用于语义缓存无法复用的结果（如混合搜索），避免其占用语义缓存的槽位。
+        """
+        expires = time.monotonic() + self.ttl
+        self._exact[key] = (expires, results)
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+        return expires
+
+    def put(self, key: tuple, params: tuple, vector: np.ndarray, results: list):
+        """同时写入精确缓存和语义缓存。"""
+        expires = self.put_exact(key, results)
+
+        if self._matrix is None:
+            self._matrix = np.zeros(
+                (self.semantic_size, vector.shape[-1]), dtype=np.float32
+            )
+        slot = self._next
+        self._next = (slot + 1) % self.semantic_size
+        self._matrix[slot] = _normalize(vector)
+        self._param_hashes[slot] = hash(params)
+        self._expires[slot] = expires
+        self._entries[slot] = (params, results)
+
+    def clear(self):
+        """清空缓存，集合数据更新后调用。"""
+        self._exact.clear()
+        self._expires[:] = 0
+        self._entries = [None] * self.semantic_size
+        self._next = 0
+
+    def stats(self) -> dict:
+        """返回缓存的命中统计。"""
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "size": len(self._exact),
+            "semantic_size": int(np.count_nonzero(self._expires)),
+        }
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """转换为 float32 并归一化为单位向量。"""
+    vector = vector.astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
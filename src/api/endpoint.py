@@ -1,13 +1,30 @@
+import asyncio
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 from typing import Any, Dict, List, Literal
 
-from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException, Request
 from pydantic import BaseModel, Field
-from pymilvus import MilvusClient
-from sentence_transformers import SentenceTransformer
-
-from ..core.config import MILVUS_TOKEN, MILVUS_URI
+from pymilvus import AnnSearchRequest, MilvusClient, WeightedRanker
+
+from ..core.config import settings
+from ..core.models import get_embedding_model
+from ..core.precision import VECTOR_NUMPY_DTYPE
+from ..core.schema_cache import (
+    describe_collection,
+    get_array_fields,
+    get_pk_field,
+    get_sparse_field,
+    get_vector_field,
+)
 from ..core.utils import logger
+from .batcher import EmbeddingBatcher
+from .cache import SearchCache
 
 
 class SearchRequest(BaseModel):
@@ -25,7 +42,17 @@ class SearchRequest(BaseModel):
     # 使用灵活的字典进行过滤，而不是固定的字符串
     filters: Dict[str, Any] | None = Field(
         None,
-        description="（可选）用于元数据过滤的键值对。示例: {'school': '三一', 'tags': '补习'}",
+        description="（可选）用于元数据过滤的键值对。示例: {'school': '三一综合学园', 'version': '新年'}",
+    )
+    exact: bool = Field(
+        True,
+        description="字符串过滤值是否精确匹配。为 false 时使用 like 进行包含匹配；值中含有 % 时按 like 模式匹配。",
+    )
+
+    hybrid: bool = Field(
+        False,
+        description="集合有 BM25 稀疏向量时，是否同时进行全文检索，并与语义搜索的结果加权融合。"
+        "开启时结果的 score 为融合得分（越大越相关），distance 为 null。",
     )
 
     # 允许用户自定义返回的字段
@@ -36,7 +63,10 @@ class SearchRequest(BaseModel):
 
 class SearchResultItem(BaseModel):
     id: Any
-    distance: float
+    # 语义搜索的 L2 距离，越小越相关；混合搜索时为 None
+    distance: float | None = None
+    # 混合搜索按权重融合后的得分，越大越相关；语义搜索时为 None
+    score: float | None = None
     entity: Dict[str, Any]
 
 
@@ -44,41 +74,69 @@ class SearchResponse(BaseModel):
     results: List[SearchResultItem]
 
 
-load_dotenv()
+# HNSW 搜索时的候选列表大小，需不小于 top_k 的上限 (20)，越大召回率越高
+SEARCH_EF = 64
+# 混合搜索时稠密向量（语义）与稀疏向量（BM25）结果的权重
+HYBRID_WEIGHTS = (0.7, 0.3)
+# 启动预热时一次编码的查询数量
+WARMUP_BATCH = 8
+# 查询向量的 LRU 缓存容量
+ENCODE_CACHE_SIZE = 2048
+# 查询文本到查询向量的缓存，热门查询（如学生姓名）可以跳过模型编码
+_encode_cache: OrderedDict[str, np.ndarray] = OrderedDict()
 
-app = FastAPI(
-    title="蔚蓝档案知识库 API",
-    description="用于在蔚蓝档案 Milvus 数据库中搜索信息的 API。",
-    version="1.0.0",
-)
 
-
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """
-    在应用启动时加载所有必要资源：
+    管理应用生命周期内的资源。
+
+    启动时：
     - 连接到 Milvus。
     - 加载句向量模型。
     - 确保所有集合都已创建索引并加载到内存中。
+
+    关闭时释放上述资源。
     """
 
     # 初始化 Milvus 客户端
-    logger.info(f"正在连接到 Milvus: {MILVUS_URI}...")
-    if not MILVUS_URI:
+    logger.info(f"正在连接到 Milvus: {settings.milvus_uri}...")
+    if not settings.milvus_uri:
         raise RuntimeError("必须在 .env 文件中设置 MILVUS_URI")
 
-    client = MilvusClient(uri=MILVUS_URI, token=MILVUS_TOKEN if MILVUS_TOKEN else "")
+    client = MilvusClient(uri=settings.milvus_uri, token=settings.milvus_token)
     app.state.milvus_client = client
+    # 阻塞的 gRPC 搜索调用使用专用线程池，不与默认执行器中的其他任务争抢线程
+    search_pool = ThreadPoolExecutor(
+        max_workers=os.cpu_count(), thread_name_prefix="search"
+    )
+    app.state.search_pool = search_pool
     logger.info("成功连接到 Milvus。")
 
-    # 加载句向量模型
-    model_name = "paraphrase-multilingual-mpnet-base-v2"
-    logger.info(f"正在加载句向量模型: {model_name}...")
-    model = SentenceTransformer(model_name)
+    # 加载句向量模型，与构建数据库共用同一个加载函数
+    model = get_embedding_model()
     app.state.embedding_model = model
-    logger.info("句向量模型加载成功。")
 
+    # 启动查询编码的批处理任务，并发请求的查询会合并为一次编码
+    batcher = EmbeddingBatcher(model)
+    batcher.start()
+    app.state.embedding_batcher = batcher
+
+    # 预热：经由批处理器在编码线程中完成一次批量编码，首个真实请求无需承担初始化开销
+    logger.info("正在预热句向量模型...")
+    await asyncio.gather(*(batcher.encode("预热") for _ in range(WARMUP_BATCH)))
+    logger.info("句向量模型预热完成。")
+
+    # 搜索结果缓存，重复或语义相近的查询可以跳过编码和 Milvus 搜索
+    app.state.search_cache = SearchCache()
+
+    # 启动时一次性缓存各集合的结构信息，搜索时无需再查询或计算
     app.state.pk_fields = {}
+    app.state.collection_fields = {}
+    app.state.vector_fields = {}
+    app.state.sparse_fields = {}
+    app.state.array_fields = {}
+    app.state.output_fields = {}
 
     # 确保所有集合都已建立索引并加载
     collections_to_load = [
@@ -96,14 +154,21 @@ async def startup_event():
                 logger.warning(f"集合 '{name}' 不存在，将跳过加载。")
                 continue
 
-            collection_info = client.describe_collection(name)
-            pk_field = next(
-                (f["name"] for f in collection_info["fields"] if f.get("is_primary")),
-                None,
-            )
+            pk_field = get_pk_field(client, name)
             if pk_field:
                 app.state.pk_fields[name] = pk_field
                 logger.info(f"缓存集合 '{name}' 的主键: '{pk_field}'")
+            vector_field = get_vector_field(client, name)
+            if vector_field:
+                app.state.vector_fields[name] = vector_field
+            sparse_field = get_sparse_field(client, name)
+            if sparse_field:
+                app.state.sparse_fields[name] = sparse_field
+            app.state.array_fields[name] = get_array_fields(client, name)
+            app.state.collection_fields[name] = describe_collection(client, name)[
+                "fields"
+            ]
+            app.state.output_fields[name] = get_default_output_fields(name)
 
             # 加载集合
             logger.info(f"正在加载集合 '{name}' 到内存...")
@@ -113,90 +178,310 @@ async def startup_event():
         except Exception as e:
             logger.error(f"准备集合 '{name}' 时失败: {e}")
 
+    yield
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """在应用关闭时释放资源。"""
     logger.info("正在释放资源...")
+    await batcher.stop()
+    search_pool.shutdown(wait=True)
+    client.close()
+    app.state.embedding_batcher = None
+    app.state.search_cache = None
+    app.state.search_pool = None
     app.state.milvus_client = None
     app.state.embedding_model = None
     logger.info("资源已释放。")
 
 
-def build_filter_expression(filters: Dict[str, Any] | None) -> str:
-    """根据字典动态构建 Milvus 的 filter 表达式。"""
+app = FastAPI(
+    title="蔚蓝档案知识库 API",
+    description="用于在蔚蓝档案 Milvus 数据库中搜索信息的 API。",
+    version="1.0.0",
+    lifespan=lifespan,
+)
+
+
+async def get_milvus_client(request: Request) -> MilvusClient:
+    """依赖项：返回启动时创建的 Milvus 客户端，所有请求复用同一个连接。
+
+    声明为协程，FastAPI 会在事件循环中直接调用，而不是派发到线程池。
+    """
+    return request.app.state.milvus_client
+
+
+async def get_embedding_batcher(request: Request) -> EmbeddingBatcher:
+    """依赖项：返回启动时创建的查询编码批处理器。"""
+    return request.app.state.embedding_batcher
+
+
+async def get_search_cache(request: Request) -> SearchCache:
+    """依赖项：返回启动时创建的搜索结果缓存。"""
+    return request.app.state.search_cache
+
+
+async def encode_query(batcher: EmbeddingBatcher, query: str) -> np.ndarray:
+    """将查询文本编码为向量，优先使用 LRU 缓存。"""
+    key = query.strip()
+    vector = _encode_cache.get(key)
+    if vector is not None:
+        _encode_cache.move_to_end(key)
+        return vector
+    # 查询向量需转换为与集合向量字段相同的存储精度。
+    # astype 会拷贝出独立的一行，缓存不会持有整个批次矩阵
+    vector = (await batcher.encode(key)).astype(VECTOR_NUMPY_DTYPE)
+    _encode_cache[key] = vector
+    if len(_encode_cache) > ENCODE_CACHE_SIZE:
+        # 淘汰最久未使用的查询
+        _encode_cache.popitem(last=False)
+    return vector
+
+
+def _quote(value: str) -> str:
+    """将字符串转义为 Milvus 表达式中的双引号字符串字面量。"""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+# 过滤字段名必须是合法的标识符，防止通过字段名注入任意表达式
+_FIELD_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# JSON 字段中的键：meta.voice_actor 或 meta["voice_actor"]
+_JSON_KEY_RE = re.compile(
+    r"([A-Za-z_][A-Za-z0-9_]*)(?:\.([A-Za-z_][A-Za-z0-9_]*)|\[[\"']([^\"'\\]+)[\"']\])"
+)
+# 已构建的过滤表达式的缓存容量
+FILTER_CACHE_SIZE = 1024
+
+
+def build_filter_expression(
+    filters: Dict[str, Any] | None,
+    exact: bool = True,
+    array_fields: frozenset[str] = frozenset(),
+) -> str:
+    """根据字典动态构建 Milvus 的 filter 表达式。
+
+    常见的过滤条件会重复出现，构建结果按过滤条件缓存。
+
+    Args:
+        filters (Dict[str, Any] | None): 字段名到过滤值的映射。
+        exact (bool, optional): 字符串值是否精确匹配。默认为 True。
+        array_fields (frozenset[str], optional): ARRAY 类型的字段名，
+            这些字段使用 ARRAY_CONTAINS / ARRAY_CONTAINS_ANY 过滤。
+
+    Raises:
+        ValueError: 字段名不是合法的标识符。
+    """
 
     if not filters:
         return ""
 
+    # 转换为可哈希的形式作为缓存键：保留字典顺序，列表转为元组；
+    # 值的类型也放入键中，避免 True 与 1 这类相等的值共用缓存
+    items = tuple(
+        (key, type(value), tuple(value) if isinstance(value, list) else value)
+        for key, value in filters.items()
+    )
+    try:
+        return _cached_filter_expression(items, exact, array_fields)
+    except TypeError:
+        # 值中含有字典等不可哈希的对象，跳过缓存直接构建
+        return _build_filter_expression(items, exact, array_fields)
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _cached_filter_expression(
+    items: tuple, exact: bool, array_fields: frozenset[str]
+) -> str:
+    return _build_filter_expression(items, exact, array_fields)
+
+
+def _field_expression(key: str) -> str:
+    """将过滤字段名转换为表达式中的字段访问，JSON 字段的键转换为 field["key"]。
+
+    Raises:
+        ValueError: 字段名既不是合法的标识符，也不是 JSON 字段的键。
+    """
+    if _FIELD_NAME_RE.fullmatch(key):
+        return key
+    match = _JSON_KEY_RE.fullmatch(key)
+    if match is None:
+        raise ValueError(f"无效的过滤字段: {key!r}")
+    field, dotted_key, bracket_key = match.groups()
+    return f"{field}[{_quote(dotted_key or bracket_key)}]"
+
+
+def _format_value(value: Any) -> str:
+    return _quote(value) if isinstance(value, str) else str(value)
+
+
+def _build_filter_expression(
+    items: tuple, exact: bool, array_fields: frozenset[str]
+) -> str:
     expressions = []
-    for key, value in filters.items():
-        # 对字符串值使用 'like' 实现包含匹配，对其他类型使用 '=='
-        if isinstance(value, str):
-            # Milvus 的 'like' 需要将模式放在双引号内
-            expressions.append(f'{key} like "%{value}%"')
-        elif isinstance(value, list):
+    for key, _, value in items:
+        field = _field_expression(key)
+        if key in array_fields:
+            # 数组字段：单个值要求数组包含该值，列表要求数组包含其中任意一个值
+            if isinstance(value, tuple):
+                formatted_list = ",".join(_format_value(v) for v in value)
+                expressions.append(f"ARRAY_CONTAINS_ANY({field}, [{formatted_list}])")
+            else:
+                expressions.append(f"ARRAY_CONTAINS({field}, {_format_value(value)})")
+        elif isinstance(value, str):
+            if "%" in value:
+                # 调用方自带通配符，按 like 模式匹配
+                expressions.append(f"{field} like {_quote(value)}")
+            elif exact:
+                # 等值匹配可以使用标量索引，而前导通配符的 like 只能逐行扫描
+                expressions.append(f"{field} == {_quote(value)}")
+            else:
+                expressions.append(f"{field} like {_quote(f'%{value}%')}")
+        elif isinstance(value, tuple):
             # 处理列表，使用 'in' 操作符
             # 确保列表中的字符串元素也被正确引用
-            formatted_list = [f'"{v}"' if isinstance(v, str) else str(v) for v in value]
-            expressions.append(f"{key} in [{','.join(formatted_list)}]")
+            formatted_list = ",".join(_format_value(v) for v in value)
+            expressions.append(f"{field} in [{formatted_list}]")
         else:
             # 处理数字等其他类型
-            expressions.append(f"{key} == {value}")
+            expressions.append(f"{field} == {value}")
 
     return " and ".join(expressions)
 
 
+# 各集合的默认输出字段，模块加载时构建一次，不可变元组可以安全复用
+_FIELD_MAP: dict[str, tuple[str, ...]] = {
+    "students": ("name", "school", "introduction", "aliases", "tags"),
+    "student_quotes": ("student_name", "version", "quote_text"),
+    "student_relations": ("student_name", "related_student_name", "relation_type"),
+    "schools": ("name", "introduction", "facilities"),
+    "clubs": ("name", "school", "description"),
+    "game_basic_info": ("category", "title", "content"),
+}
+_DEFAULT_FIELDS = ("*",)
+
+
 def get_default_output_fields(collection_name: str) -> List[str]:
     """根据集合名称返回默认的输出字段列表。"""
 
-    field_map = {
-        "students": ["name", "school", "introduction", "aliases", "tags"],
-        "student_quotes": ["student_name", "version", "quote_text"],
-        "student_relations": ["student_name", "related_student_name", "relation_type"],
-        "schools": ["name", "introduction", "facilities"],
-        "clubs": ["name", "school", "description"],
-        "game_basic_info": ["category", "title", "content"],
-    }
-    return field_map.get(collection_name, ["*"])
+    # PyMilvus 要求传入列表
+    return list(_FIELD_MAP.get(collection_name, _DEFAULT_FIELDS))
 
 
 @app.post("/api/v1/search", response_model=SearchResponse, summary="通用混合搜索")
 async def search(
     request: SearchRequest,
-    client: MilvusClient = Depends(lambda: app.state.milvus_client),
-    model: SentenceTransformer = Depends(lambda: app.state.embedding_model),
+    client: MilvusClient = Depends(get_milvus_client),
+    batcher: EmbeddingBatcher = Depends(get_embedding_batcher),
+    cache: SearchCache = Depends(get_search_cache),
 ):
     """
     在指定的集合中执行混合搜索（元数据过滤 + 向量相似性搜索）。
     """
+    # 构建动态过滤器
+    try:
+        filter_expression = build_filter_expression(
+            request.filters,
+            request.exact,
+            app.state.array_fields.get(request.collection_name, frozenset()),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if filter_expression:
+        logger.info(f"应用过滤器: {filter_expression}")
+
+    # 确定输出字段
+    output_fields = (
+        request.output_fields
+        or app.state.output_fields.get(request.collection_name)
+        or get_default_output_fields(request.collection_name)
+    )
+
+    # 集合有稀疏向量字段时进行混合搜索
+    sparse_field = (
+        app.state.sparse_fields.get(request.collection_name) if request.hybrid else None
+    )
+
+    # 精确缓存命中时连查询编码也可以跳过
+    query = request.query.strip()
+    cache_key = (
+        request.collection_name,
+        query,
+        request.top_k,
+        filter_expression,
+        tuple(output_fields),
+        sparse_field is not None,
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"查询命中缓存: {query}")
+        return {"results": cached}
+
     # 将查询文本编码为向量
     try:
         logger.info(f"正在处理查询: {request.query}...")
-        query_vector = model.encode(request.query, convert_to_tensor=False).tolist()
+        query_vector = await encode_query(batcher, query)
     except Exception as e:
         logger.error(f"查询编码失败: {e}")
         raise HTTPException(status_code=500, detail="处理查询文本失败。")
 
-    # 构建动态过滤器
-    filter_expression = build_filter_expression(request.filters)
-    if filter_expression:
-        logger.info(f"应用过滤器: {filter_expression}")
-
-    # 确定输出字段
-    output_fields = request.output_fields or get_default_output_fields(
-        request.collection_name
-    )
+    # 语义缓存：除查询文本外的搜索参数相同，且查询向量足够相似时复用结果。
+    # 混合搜索的 BM25 结果取决于查询中的具体词语，相似的查询向量不代表结果相同，不使用语义缓存
+    cache_params = (cache_key[0], *cache_key[2:])
+    if sparse_field is None:
+        cached = cache.get_similar(cache_params, query_vector)
+        if cached is not None:
+            logger.info(f"查询命中语义缓存: {query}")
+            return {"results": cached}
+    else:
+        cache.record_miss()
+
+    # 一次性构建搜索参数
+    search_params = {"metric_type": "L2", "params": {"ef": SEARCH_EF}}
+    vector_field = app.state.vector_fields.get(request.collection_name)
+    if sparse_field:
+        # 稠密向量和 BM25 稀疏向量各自搜索，结果按权重融合
+        run_search = client.hybrid_search
+        search_kwargs = {
+            "collection_name": request.collection_name,
+            "reqs": [
+                AnnSearchRequest(
+                    data=[query_vector],
+                    anns_field=vector_field,
+                    param=search_params,
+                    limit=request.top_k,
+                    expr=filter_expression or None,
+                ),
+                AnnSearchRequest(
+                    data=[query],
+                    anns_field=sparse_field,
+                    param={"metric_type": "BM25"},
+                    limit=request.top_k,
+                    expr=filter_expression or None,
+                ),
+            ],
+            "ranker": WeightedRanker(*HYBRID_WEIGHTS),
+            "limit": request.top_k,
+            "output_fields": output_fields,
+        }
+    else:
+        run_search = client.search
+        search_kwargs = {
+            "collection_name": request.collection_name,
+            "data": [query_vector],
+            "limit": request.top_k,
+            "output_fields": output_fields,
+            "search_params": search_params,
+        }
+        # 显式指定向量字段，集合有多个向量字段时也能正确搜索
+        if vector_field:
+            search_kwargs["anns_field"] = vector_field
+        # 没有过滤条件时不传 filter，避免服务端解析空表达式
+        if filter_expression:
+            search_kwargs["filter"] = filter_expression
 
     # 执行搜索
     try:
-        raw_results = client.search(
-            collection_name=request.collection_name,
-            data=[query_vector],
-            limit=request.top_k,
-            filter=filter_expression,
-            output_fields=output_fields,
-            search_params={"metric_type": "L2"},
+        # 搜索是阻塞的 gRPC 调用，放到专用线程池中执行，避免阻塞事件循环
+        raw_results = await asyncio.get_running_loop().run_in_executor(
+            app.state.search_pool, partial(run_search, **search_kwargs)
         )
 
         primary_key_field = app.state.pk_fields.get(request.collection_name)
@@ -210,11 +495,20 @@ async def search(
         for hit in raw_results[0]:
             formatted_hit = {
                 "id": hit.get(primary_key_field),
-                "distance": hit.get("distance"),
                 "entity": hit.get("entity"),
             }
+            # 混合搜索返回的是融合得分，与 L2 距离的含义相反，放在单独的字段中
+            if sparse_field:
+                formatted_hit["score"] = hit.get("distance")
+            else:
+                formatted_hit["distance"] = hit.get("distance")
             formatted_results.append(formatted_hit)
 
+        if sparse_field:
+            # 混合搜索的结果不能被语义缓存复用，只写入精确缓存
+            cache.put_exact(cache_key, formatted_results)
+        else:
+            cache.put(cache_key, cache_params, query_vector, formatted_results)
         return {"results": formatted_results}
     except Exception as e:
         logger.error(f"在集合 '{request.collection_name}' 上搜索失败: {e}")
@@ -226,6 +520,91 @@ async def search(
         raise HTTPException(status_code=500, detail="搜索过程中发生错误。")
 
 
+def two_hop_expand(
+    client: MilvusClient, student_name: str
+) -> tuple[list[str], list[str]]:
+    """查找与学生直接相关以及间接相关（两跳）的学生。
+
+    档案中的相关人物不一定是相互的，两个方向都计入：
+    第一跳是该学生自己的 related_students，加上相关人物中包含该学生的学生，一次查询取得；
+    第二跳用 ARRAY_CONTAINS_ANY 一次查询相关人物中包含第一跳任意学生的学生，
+    同时取回第一跳学生自己的 related_students。related_students 建有 BITMAP 索引，
+    集合的并运算由服务端完成，无需在 Python 中逐个展开。
+
+    Returns:
+        tuple[list[str], list[str]]: (直接相关的学生, 仅间接相关的学生)。
+    """
+
+    array_fields = frozenset({"related_students"})
+
+    def query_neighbors(
+        names: str | list[str],
+    ) -> tuple[list[str], list[str]]:
+        """返回 (names 中学生自己的相关人物, 相关人物中包含 names 中学生的学生)。"""
+        own = build_filter_expression({"name": names})
+        reverse = build_filter_expression(
+            {"related_students": names}, array_fields=array_fields
+        )
+        rows = client.query(
+            collection_name="students",
+            filter=f"{own} or {reverse}",
+            output_fields=["name", "related_students"],
+        )
+        members = {names} if isinstance(names, str) else set(names)
+        forward = [
+            related
+            for row in rows
+            if row["name"] in members
+            for related in row.get("related_students") or []
+        ]
+        backward = [
+            row["name"]
+            for row in rows
+            if members.intersection(row.get("related_students") or [])
+        ]
+        return forward, backward
+
+    # dict.fromkeys 去重并保持顺序：先是档案中列出的相关人物，再是反向关联的学生
+    forward, backward = query_neighbors(student_name)
+    direct = [
+        name for name in dict.fromkeys(forward + backward) if name != student_name
+    ]
+    if not direct:
+        return [], []
+    seen = {student_name, *direct}
+    forward, backward = query_neighbors(direct)
+    indirect = [name for name in dict.fromkeys(forward + backward) if name not in seen]
+    return direct, indirect
+
+
+@app.get("/api/v1/students/{student_name}/related", summary="相关学生两跳查询")
+async def related_students(
+    student_name: str, client: MilvusClient = Depends(get_milvus_client)
+):
+    """返回与学生直接相关和间接相关（两跳）的学生姓名。"""
+    try:
+        direct, indirect = await asyncio.get_running_loop().run_in_executor(
+            app.state.search_pool, partial(two_hop_expand, client, student_name)
+        )
+    except Exception as e:
+        logger.error(f"查询学生 '{student_name}' 的相关学生失败: {e}")
+        raise HTTPException(status_code=500, detail="查询相关学生时发生错误。")
+    return {"student_name": student_name, "related": direct, "two_hop": indirect}
+
+
+@app.get("/api/v1/cache/stats", summary="搜索缓存统计")
+async def cache_stats(cache: SearchCache = Depends(get_search_cache)):
+    """返回搜索结果缓存的命中次数和容量。"""
+    return cache.stats()
+
+
+@app.delete("/api/v1/cache", summary="清空搜索缓存")
+async def clear_cache(cache: SearchCache = Depends(get_search_cache)):
+    """清空搜索结果缓存，集合数据重新导入后调用。"""
+    cache.clear()
+    return {"message": "缓存已清空。"}
+
+
 @app.get("/", summary="API根目录")
 async def root():
     return {"message": "欢迎使用蔚蓝档案知识库 API。请访问 /docs 查看交互式文档。"}
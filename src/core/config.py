@@ -1,13 +1,32 @@
 import os
+from dataclasses import dataclass
 
 from dotenv import load_dotenv
 
-# 从项目根目录的 .env 文件加载环境变量
+# 从项目根目录的 .env 文件加载环境变量，整个进程只在此处加载一次
 load_dotenv()
 
-# Milvus/Zilliz Cloud 连接信息
-MILVUS_URI = os.getenv("MILVUS_URI")
-MILVUS_TOKEN = os.getenv("MILVUS_TOKEN")
+
+@dataclass(frozen=True)
+class Settings:
+    """运行时配置，导入时从环境变量构建一次，之后不可修改。"""
+
+    # Milvus/Zilliz Cloud 连接信息
+    milvus_uri: str | None
+    milvus_token: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            milvus_uri=os.getenv("MILVUS_URI"),
+            milvus_token=os.getenv("MILVUS_TOKEN") or "",
+        )
+
+
+settings = Settings.from_env()
 
 # 向量维度
 VECTOR_DIM = 768
+# 向量存储精度："float32"、"float16" 或 "bfloat16"（需要 ml_dtypes）。
+# 所有集合的向量字段、插入和查询的向量统一使用该精度，修改后需重建数据库
+VECTOR_PRECISION = "float16"
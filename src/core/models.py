@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+from .utils import logger
+
+# 句向量模型名称 (推荐使用多语言模型以处理中英文混合内容)
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-mpnet-base-v2"
+
+
+@lru_cache(maxsize=1)
+def get_embedding_model() -> SentenceTransformer:
+    """加载句向量模型，同一进程内只加载一次，构建数据库和 API 服务共用同一个实例。
+
+    模型切换为推理模式；有 CUDA 时使用半精度权重，减少显存占用并加快计算。
+    model.encode 内部已在 inference_mode 下运行，无需再全局关闭梯度。
+    """
+
+    logger.info(f"正在加载句向量模型: {EMBEDDING_MODEL_NAME}...")
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    model.eval()
+    if torch.cuda.is_available():
+        model.half()
+    logger.info("句向量模型加载成功。")
+    return model
@@ -0,0 +1,30 @@
+import numpy as np
+from pymilvus import DataType
+
+from .config import VECTOR_PRECISION
+
+# 向量存储精度对应的 Milvus 向量字段类型
+_VECTOR_DATA_TYPES = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+    "bfloat16": DataType.BFLOAT16_VECTOR,
+}
+
+
+def _numpy_dtype(precision: str) -> np.dtype:
+    """返回向量存储精度对应的 NumPy 类型，写入和查询的向量都需转换为该类型。"""
+    if precision == "bfloat16":
+        # NumPy 没有内置 bfloat16，需要安装 ml_dtypes 提供的扩展类型
+        from ml_dtypes import bfloat16
+
+        return np.dtype(bfloat16)
+    return np.dtype(precision)
+
+
+if VECTOR_PRECISION not in _VECTOR_DATA_TYPES:
+    raise ValueError(f"不支持的向量精度: {VECTOR_PRECISION!r}")
+
+# 所有集合向量字段的类型
+VECTOR_DATA_TYPE = _VECTOR_DATA_TYPES[VECTOR_PRECISION]
+# 向量在插入和搜索前转换为的 NumPy 类型
+VECTOR_NUMPY_DTYPE = _numpy_dtype(VECTOR_PRECISION)
@@ -0,0 +1,81 @@
+from pymilvus import DataType, FieldSchema, MilvusClient
+
+# 集合名称到集合结构描述的缓存。集合结构只在重建集合时改变，无需每次都通过 RPC 查询
+SCHEMA_CACHE: dict[str, dict] = {}
+
+# 用于语义搜索的稠密向量字段类型
+DENSE_VECTOR_TYPES = (
+    DataType.FLOAT_VECTOR,
+    DataType.FLOAT16_VECTOR,
+    DataType.BFLOAT16_VECTOR,
+)
+
+
+def describe_collection(client: MilvusClient, collection_name: str) -> dict:
+    """返回集合的结构描述，首次查询后缓存。"""
+    info = SCHEMA_CACHE.get(collection_name)
+    if info is None:
+        info = client.describe_collection(collection_name)
+        SCHEMA_CACHE[collection_name] = info
+    return info
+
+
+def seed_schema(collection_name: str, fields: list[FieldSchema]):
+    """用本地的字段定义预先填充缓存，刚创建的集合无需再查询结构。
+
+    FieldSchema.to_dict() 与 describe_collection 返回的字段描述格式一致。
+    """
+    SCHEMA_CACHE[collection_name] = {
+        "collection_name": collection_name,
+        "fields": [field.to_dict() for field in fields],
+    }
+
+
+def invalidate_schema(collection_name: str):
+    """集合被删除或重建后清除其缓存。"""
+    SCHEMA_CACHE.pop(collection_name, None)
+
+
+def get_pk_field(client: MilvusClient, collection_name: str) -> str | None:
+    """返回集合的主键字段名。"""
+    return next(
+        (
+            f["name"]
+            for f in describe_collection(client, collection_name)["fields"]
+            if f.get("is_primary")
+        ),
+        None,
+    )
+
+
+def get_vector_field(client: MilvusClient, collection_name: str) -> str | None:
+    """返回集合中第一个稠密向量字段的名称。"""
+    return next(
+        (
+            f["name"]
+            for f in describe_collection(client, collection_name)["fields"]
+            if f.get("type") in DENSE_VECTOR_TYPES
+        ),
+        None,
+    )
+
+
+def get_sparse_field(client: MilvusClient, collection_name: str) -> str | None:
+    """返回集合中稀疏向量字段的名称，没有时返回 None。"""
+    return next(
+        (
+            f["name"]
+            for f in describe_collection(client, collection_name)["fields"]
+            if f.get("type") == DataType.SPARSE_FLOAT_VECTOR
+        ),
+        None,
+    )
+
+
+def get_array_fields(client: MilvusClient, collection_name: str) -> frozenset[str]:
+    """返回集合中所有 ARRAY 字段的名称，过滤时需要使用 ARRAY_CONTAINS。"""
+    return frozenset(
+        f["name"]
+        for f in describe_collection(client, collection_name)["fields"]
+        if f.get("type") == DataType.ARRAY
+    )
@@ -1,51 +1,198 @@
-import json
 from pathlib import Path
 
-from pymilvus import CollectionSchema, FieldSchema, MilvusClient
+import orjson
+from pymilvus import MilvusClient
 from sentence_transformers import SentenceTransformer
 
-from ..core.config import MILVUS_URI
+from ..core.config import settings
+from ..core.models import get_embedding_model
+from ..core.schema_cache import get_vector_field, invalidate_schema, seed_schema
 from ..core.utils import logger
-from .insert_data import process_and_insert_school, process_and_insert_student
+from .insert_data import (
+    collect_school_payloads,
+    collect_student_payloads,
+    encode_and_insert,
+)
+from .schema_spec import META_FIELD, SPARSE_FIELD
 from .schemas import (
-    club_fields,
-    game_basic_info_fields,
-    quote_fields,
-    relation_fields,
-    school_fields,
-    student_fields,
+    BM25_INPUT_FIELDS,
+    CONSISTENCY_LEVELS,
+    JSON_PATH_INDEX_PARAMS,
+    bm25_index_params,
+    build_fields,
+    build_schema,
+    club_index_params,
+    club_scalar_index_params,
+    game_basic_info_index_params,
+    game_basic_info_scalar_index_params,
+    quote_index_params,
+    quote_scalar_index_params,
+    relation_index_params,
+    relation_scalar_index_params,
+    school_index_params,
+    school_scalar_index_params,
+    student_index_params,
+    student_scalar_index_params,
+    varchar_max_lengths,
 )
 
+# 使用分区键的集合的分区数量。学生只有一百个左右，分区过多会使每个分区的数据过少
+PARTITION_KEY_PARTITIONS = 16
 
-def create_collections(
-    client: MilvusClient,
-    fields: list[FieldSchema],
-    collection_name: str,
-    description: str = "",
-):
+
+def create_collections(client: MilvusClient, collection_name: str):
     """创建 Milvus 集合
 
     Args:
         client (MilvusClient): Milvus 客户端实例。
-        fields (list[FieldSchema]): 集合字段定义列表。
-        collection_name (str): 集合名称。
-        description (str, optional): 集合描述。默认为空字符串。
+        collection_name (str): 集合名称，字段定义和描述见 schemas。
     """
 
     if client.has_collection(collection_name):
         logger.info(f"集合 '{collection_name}' 已存在，将被删除并重建。")
         client.drop_collection(collection_name)
+        invalidate_schema(collection_name)
 
-    schema = CollectionSchema(
-        fields=fields, auto_id=True, description=description, enable_dynamic_field=False
-    )
+    schema = build_schema(collection_name)
+
+    # 含分区键（如台词、关系集合的 student_name，游戏基本信息的 category）的集合
+    # 按分区键的哈希值分布到固定数量的分区，带有分区键等值条件的搜索只需查找对应的分区
+    kwargs = {}
+    if schema.partition_key_field is not None:
+        kwargs["num_partitions"] = PARTITION_KEY_PARTITIONS
 
     client.create_collection(
-        collection_name=collection_name, schema=schema, description=description
+        collection_name=collection_name,
+        schema=schema,
+        description=schema.description,
+        consistency_level=CONSISTENCY_LEVELS.get(collection_name, "Bounded"),
+        **kwargs,
     )
+    seed_schema(collection_name, schema.fields)
     logger.info(f"集合 '{collection_name}' 创建成功。")
 
 
+def refresh(client: MilvusClient, collection_names: list[str]):
+    """数据全部写入后统一刷新集合，将增长中的数据段落盘，确保数据对搜索可见
+
+    Args:
+        client (MilvusClient): Milvus 客户端实例。
+        collection_names (list[str]): 集合名称列表。
+    """
+
+    for collection_name in collection_names:
+        if not client.has_collection(collection_name):
+            continue
+        logger.info(f"正在刷新 '{collection_name}' 集合以确保数据可见...")
+        client.flush(collection_name=collection_name)
+        logger.info(f"'{collection_name}' 集合刷新完成。")
+
+
+def create_vector_index(
+    client: MilvusClient,
+    collection_name: str,
+    vector_field: str,
+    vector_index_params: dict,
+):
+    """使用 schemas 中为该集合声明的 HNSW 参数构建向量索引，而不是由服务端决定的 AUTOINDEX
+
+    服务端不支持 HNSW_SQ 量化索引时，退回使用相同参数的普通 HNSW 索引。
+
+    Args:
+        client (MilvusClient): Milvus 客户端实例。
+        collection_name (str): 集合名称。
+        vector_field (str): 向量字段名称。
+        vector_index_params (dict): 向量索引参数。
+    """
+
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name=vector_field, **vector_index_params)
+    try:
+        client.create_index(collection_name=collection_name, index_params=index_params)
+    except Exception as e:
+        if vector_index_params["index_type"] != "HNSW_SQ":
+            raise
+        logger.warning(
+            f"集合 '{collection_name}' 构建 HNSW_SQ 索引失败，改用 HNSW 索引: {e}"
+        )
+        params = dict(vector_index_params["params"])
+        params.pop("sq_type", None)
+        index_params = client.prepare_index_params()
+        index_params.add_index(
+            field_name=vector_field,
+            index_type="HNSW",
+            metric_type=vector_index_params["metric_type"],
+            params=params,
+        )
+        client.create_index(collection_name=collection_name, index_params=index_params)
+
+
+def create_json_path_indexes(
+    client: MilvusClient,
+    collection_name: str,
+    json_path_index_params: list[tuple[str, str]],
+):
+    """为 JSON 扩展字段中常用于过滤的键建立 JSON 路径索引
+
+    Args:
+        client (MilvusClient): Milvus 客户端实例。
+        collection_name (str): 集合名称。
+        json_path_index_params (list[tuple[str, str]]): (键名, 转换类型) 列表。
+    """
+
+    for key, cast_type in json_path_index_params:
+        json_path = f'{META_FIELD}["{key}"]'
+        try:
+            index_params = client.prepare_index_params()
+            index_params.add_index(
+                field_name=META_FIELD,
+                index_type="INVERTED",
+                index_name=f"{META_FIELD}_{key}_index",
+                params={"json_path": json_path, "json_cast_type": cast_type},
+            )
+            client.create_index(
+                collection_name=collection_name, index_params=index_params
+            )
+        except Exception as e:
+            logger.error(
+                f"为集合 '{collection_name}' 的 {json_path} 构建 JSON 路径索引时出错: {e}"
+            )
+            continue
+        logger.info(f"集合 '{collection_name}' 的 {json_path} JSON 路径索引构建成功。")
+
+
+def create_scalar_indexes(
+    client: MilvusClient,
+    collection_name: str,
+    scalar_index_params: list[tuple[str, str]],
+):
+    """为集合中用于过滤的标量字段建立索引
+
+    每个字段单独建立索引，某个字段失败（如字段不存在）不影响其他字段。
+
+    Args:
+        client (MilvusClient): Milvus 客户端实例。
+        collection_name (str): 集合名称。
+        scalar_index_params (list[tuple[str, str]]): (字段名, 索引类型) 列表。
+    """
+
+    for field_name, index_type in scalar_index_params:
+        try:
+            index_params = client.prepare_index_params()
+            index_params.add_index(field_name=field_name, index_type=index_type)
+            client.create_index(
+                collection_name=collection_name, index_params=index_params
+            )
+        except Exception as e:
+            logger.error(
+                f"为集合 '{collection_name}' 的字段 '{field_name}' 构建 {index_type} 索引时出错: {e}"
+            )
+            continue
+        logger.info(
+            f"集合 '{collection_name}' 的字段 '{field_name}' {index_type} 索引构建成功。"
+        )
+
+
 def insert_student_data(client: MilvusClient, model: SentenceTransformer):
     """加载所有学生JSON文件并将其插入Milvus"""
     logger.info("开始准备和插入学生数据...")
@@ -56,29 +203,40 @@ def insert_student_data(client: MilvusClient, model: SentenceTransformer):
         logger.warning(f"数据目录不存在: {data_dir}")
         return
 
-    student_files = list(data_dir.glob("*.json"))
+    # 目录下只有一层文件，直接遍历并检查扩展名，无需 glob 的模式匹配
+    student_files = [p for p in data_dir.iterdir() if p.suffix == ".json"]
     if not student_files:
         logger.warning(f"在 {data_dir} 中未找到学生JSON文件。")
         return
 
     logger.info(f"找到 {len(student_files)} 个学生文件。开始处理...")
 
-    # 循环处理并插入每个文件
-    for file_path in student_files:
-        process_and_insert_student(client, model, file_path)
-
-    # Flush集合以确保数据可被搜索
-    logger.info("正在刷新 'students' 集合以确保数据可见...")
-    client.flush(collection_name="students")
-    logger.info("'students' 集合刷新完成。")
-
-    logger.info("正在刷新 'student_quotes' 集合以确保数据可见...")
-    client.flush(collection_name="student_quotes")
-    logger.info("'student_quotes' 集合刷新完成。")
-
-    logger.info("正在刷新 'student_relations' 集合以确保数据可见...")
-    client.flush(collection_name="student_relations")
-    logger.info("'student_relations' 集合刷新完成。")
+    # 先解析所有文件，再按集合一次批量生成向量并插入
+    students, quotes, relations = collect_student_payloads(student_files)
+    encode_and_insert(
+        client,
+        model,
+        "students",
+        "vector",
+        students,
+        varchar_max_lengths(build_fields("students")),
+    )
+    encode_and_insert(
+        client,
+        model,
+        "student_quotes",
+        "quote_vector",
+        quotes,
+        varchar_max_lengths(build_fields("student_quotes")),
+    )
+    encode_and_insert(
+        client,
+        model,
+        "student_relations",
+        "relation_vector",
+        relations,
+        varchar_max_lengths(build_fields("student_relations")),
+    )
 
 
 def insert_school_data(client: MilvusClient, model: SentenceTransformer):
@@ -92,25 +250,32 @@ def insert_school_data(client: MilvusClient, model: SentenceTransformer):
         logger.warning(f"学校数据目录不存在: {data_dir}")
         return
 
-    school_files = list(data_dir.glob("*.json"))
+    # 目录下只有一层文件，直接遍历并检查扩展名，无需 glob 的模式匹配
+    school_files = [p for p in data_dir.iterdir() if p.suffix == ".json"]
     if not school_files:
         logger.warning(f"在 {data_dir} 中未找到学校JSON文件。")
         return
 
     logger.info(f"找到 {len(school_files)} 个学校文件。开始处理...")
 
-    # 循环处理并插入每个文件
-    for file_path in school_files:
-        process_and_insert_school(client, model, file_path)
-
-    # Flush集合以确保数据可被搜索
-    logger.info("正在刷新 'schools' 集合...")
-    client.flush(collection_name="schools")
-    logger.info("'schools' 集合刷新完成。")
-
-    logger.info("正在刷新 'clubs' 集合...")
-    client.flush(collection_name="clubs")
-    logger.info("'clubs' 集合刷新完成。")
+    # 先解析所有文件，再按集合一次批量生成向量并插入
+    schools, clubs = collect_school_payloads(school_files)
+    encode_and_insert(
+        client,
+        model,
+        "schools",
+        "vector",
+        schools,
+        varchar_max_lengths(build_fields("schools")),
+    )
+    encode_and_insert(
+        client,
+        model,
+        "clubs",
+        "vector",
+        clubs,
+        varchar_max_lengths(build_fields("clubs")),
+    )
 
 
 def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer):
@@ -123,14 +288,13 @@ def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer
         return
 
     try:
-        with data_file.open("r", encoding="utf-8") as f:
-            game_data = json.load(f)
+        game_data = orjson.loads(data_file.read_bytes())
     except Exception as e:
         logger.error(f"加载游戏基本信息JSON文件失败: {e}")
         return
 
     all_info_entries = []
-    logger.info("正在处理游戏基本信息条目并生成向量...")
+    logger.info("正在处理游戏基本信息条目...")
 
     def process_items(category, items, parent_title=None):
         # items 可能是字符串列表，也可能是字典列表
@@ -141,7 +305,6 @@ def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer
                     "category": category,
                     "title": parent_title or category,
                     "content": item,
-                    "vector": model.encode(item, convert_to_tensor=False).tolist(),
                 }
                 all_info_entries.append(entry)
             elif isinstance(item, dict):
@@ -156,9 +319,6 @@ def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer
                                 "category": category,
                                 "title": title,
                                 "content": c,
-                                "vector": model.encode(
-                                    c, convert_to_tensor=False
-                                ).tolist(),
                             }
                             all_info_entries.append(entry)
                 elif isinstance(content, str):
@@ -166,9 +326,6 @@ def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer
                         "category": category,
                         "title": title,
                         "content": content,
-                        "vector": model.encode(
-                            content, convert_to_tensor=False
-                        ).tolist(),
                     }
                     all_info_entries.append(entry)
                 # 递归处理 subsections
@@ -176,6 +333,7 @@ def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer
                 if isinstance(subsections, list) and subsections:
                     process_items(category, subsections, parent_title=title)
 
+    # 第一遍：递归收集所有条目
     for category, items in game_data.items():
         process_items(category, items)
 
@@ -183,19 +341,15 @@ def insert_game_basic_info_data(client: MilvusClient, model: SentenceTransformer
         logger.warning("没有找到可插入的游戏基本信息数据。")
         return
 
-    try:
-        logger.info(
-            f"正在向 'game_basic_info' 集合插入 {len(all_info_entries)} 条数据..."
-        )
-        client.insert(collection_name="game_basic_info", data=all_info_entries)
-        logger.info("游戏基本信息数据插入成功。")
-    except Exception as e:
-        logger.error(f"向 'game_basic_info' 集合插入数据时出错: {e}")
-        return
-
-    logger.info("正在刷新 'game_basic_info' 集合以确保数据可见...")
-    client.flush(collection_name="game_basic_info")
-    logger.info("'game_basic_info' 集合刷新完成。")
+    # 第二遍：所有条目内容一次批量生成向量并插入
+    encode_and_insert(
+        client,
+        model,
+        "game_basic_info",
+        "vector",
+        [(entry, entry["content"]) for entry in all_info_entries],
+        varchar_max_lengths(build_fields("game_basic_info")),
+    )
 
 
 def build_database():
@@ -203,33 +357,54 @@ def build_database():
 
     # if not MILVUS_URI or not MILVUS_TOKEN:
     #     raise ValueError("请在 .env 文件中设置 MILVUS_URI 和 MILVUS_TOKEN")
-    if not MILVUS_URI:
+    if not settings.milvus_uri:
         raise ValueError("请在 .env 文件中设置 MILVUS_URI")
     # 初始化 Milvus 客户端
-    client = MilvusClient(uri=MILVUS_URI)
+    client = MilvusClient(uri=settings.milvus_uri)
 
     # 创建集合
     collections = [
-        ("students", "学生信息集合", student_fields),
-        ("student_quotes", "学生名言集合", quote_fields),
-        ("student_relations", "学生关系集合", relation_fields),
-        ("schools", "学校信息集合", school_fields),
-        ("clubs", "社团信息集合", club_fields),
-        ("game_basic_info", "游戏基本信息集合", game_basic_info_fields),
+        (
+            "students",
+            student_index_params,
+            student_scalar_index_params,
+        ),
+        (
+            "student_quotes",
+            quote_index_params,
+            quote_scalar_index_params,
+        ),
+        (
+            "student_relations",
+            relation_index_params,
+            relation_scalar_index_params,
+        ),
+        (
+            "schools",
+            school_index_params,
+            school_scalar_index_params,
+        ),
+        (
+            "clubs",
+            club_index_params,
+            club_scalar_index_params,
+        ),
+        (
+            "game_basic_info",
+            game_basic_info_index_params,
+            game_basic_info_scalar_index_params,
+        ),
     ]
-    for name, description, fields in collections:
+    for name, _, _ in collections:
         try:
-            create_collections(client, fields, name, description)
+            create_collections(client, name)
         except Exception as e:
             logger.error(f"创建集合 '{name}' 时出错: {e}")
             continue
 
-    # 加载嵌入模型 (推荐使用多语言模型以处理中英文混合内容)
-    model_name = "paraphrase-multilingual-mpnet-base-v2"
+    # 加载嵌入模型
     try:
-        logger.info(f"正在加载嵌入模型: {model_name}...")
-        model = SentenceTransformer(model_name)
-        logger.info("嵌入模型加载成功。")
+        model = get_embedding_model()
     except Exception as e:
         logger.error(f"加载嵌入模型失败: {e}")
         logger.error(
@@ -246,24 +421,19 @@ def build_database():
     # 插入游戏基本信息数据
     insert_game_basic_info_data(client, model)
 
-    # 构建所有向量索引
-    logger.info("正在为所有集合构建向量索引...")
-    for collection, _, _ in collections:
+    # 全部写入完成后再统一刷新，确保数据可被搜索
+    refresh(client, [name for name, *_ in collections])
+
+    # 构建所有向量索引和标量索引
+    logger.info("正在为所有集合构建索引...")
+    for collection, vector_index_params, scalar_index_params in collections:
         try:
             if not client.has_collection(collection):
                 logger.warning(f"集合 '{collection}' 不存在，跳过索引构建。")
                 continue
 
-            # 自动确定向量字段名
-            collection_info = client.describe_collection(collection)
-            vector_field = next(
-                (
-                    f["name"]
-                    for f in collection_info["fields"]
-                    if f["name"].endswith("vector")
-                ),
-                None,
-            )
+            # 自动确定向量字段名（刚创建的集合结构已在缓存中，无需 RPC）
+            vector_field = get_vector_field(client, collection)
             if not vector_field:
                 logger.warning(
                     f"在集合 '{collection}' 中未找到向量字段，跳过索引构建。"
@@ -272,17 +442,16 @@ def build_database():
 
             # 构建索引
             logger.info(f"正在为集合 '{collection}' 构建向量索引...")
-            index_params = client.prepare_index_params()
-            index_params.add_index(
-                field_name=vector_field,
-                index_type="AUTOINDEX",
-                metric_type="L2",
-            )
-            client.create_index(
-                collection_name=collection,
-                index_params=index_params,
-            )
+            create_vector_index(client, collection, vector_field, vector_index_params)
+            if collection in BM25_INPUT_FIELDS:
+                create_vector_index(client, collection, SPARSE_FIELD, bm25_index_params)
             logger.info(f"集合 '{collection}' 的向量索引构建成功。")
 
+            # 构建过滤字段的标量索引
+            create_scalar_indexes(client, collection, scalar_index_params)
+            create_json_path_indexes(
+                client, collection, JSON_PATH_INDEX_PARAMS.get(collection, [])
+            )
+
         except Exception as e:
             logger.error(f"为集合 '{collection}' 构建索引时出错: {e}")
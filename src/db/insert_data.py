@@ -1,10 +1,54 @@
-import json
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from pymilvus import MilvusClient
-from sentence_transformers import SentenceTransformer
+import numpy as np
+import orjson
 
+from ..core.precision import VECTOR_NUMPY_DTYPE
 from ..core.utils import logger
+from .schema_spec import MAX_RELATED_STUDENTS, META_FIELD
+
+# 只用于类型标注。解析 JSON 的工作进程会导入本模块，不应因此加载 torch 和 gRPC 客户端
+if TYPE_CHECKING:
+    from pymilvus import MilvusClient
+    from sentence_transformers import SentenceTransformer
+
+# 批量生成向量时每个前向计算批次的文本数量
+ENCODE_BATCH_SIZE = 64
+# 单个 token 最多对应的字符数的保守估计，用于在分词前截断超长文本
+MAX_CHARS_PER_TOKEN = 8
+# 多进程解析 JSON 文件时每个任务包含的文件数，减少进程间通信次数
+PARSE_CHUNK_SIZE = 16
+# 解析 JSON 的工作进程由 forkserver 创建。构建流程中此时已有 gRPC 客户端、
+# 编码和插入的线程，直接 fork 当前进程并不安全；forkserver 从干净的服务进程派生工作进程
+PARSE_MP_CONTEXT = multiprocessing.get_context("forkserver")
+# 单次 insert 请求最多包含的行数，避免单个 gRPC 消息过大
+INSERT_BATCH_SIZE = 1000
+# 同时进行的 insert 请求数量上限
+INSERT_WORKERS = 4
+
+# 所属团体中的学校关键词到学校全称的映射
+SCHOOL_MAP = {
+    "三一": "三一综合学园",
+    "格赫娜": "格赫娜学园",
+    "千年": "千年科学学园",
+    "阿拜多斯": "阿拜多斯高中",
+    "赤冬": "赤冬联邦学园",
+    "山海经": "山海经高级中学",
+    "瓦尔基里": "瓦尔基里警察学校",
+    "SRT": "SRT特殊学园",
+    "百鬼夜行": "百鬼夜行联合学园",
+    "阿里乌斯": "阿里乌斯分校",
+}
+# 所有学校关键词编译为一个正则，一次扫描即可找到匹配的关键词
+SCHOOL_PATTERN = re.compile("|".join(map(re.escape, SCHOOL_MAP)))
+
+# 待插入的一行数据及其用于生成向量的文本
+Payload = tuple[dict, str]
 
 
 def _format_text_from_sections(data, keys):
@@ -25,24 +69,141 @@ def _format_text_from_sections(data, keys):
                             full_text.append(str(item["content"]))
             else:
                 full_text.append(str(section))
-    # 清理并连接文本
+    # 清理并连接文本：一次遍历完成去空白、过滤空行和去除表格分隔符，
+    # 每行只 strip 一次，不含 | 的行（绝大多数）无需再复制
     return "\n".join(
-        [line.strip().replace("|", "") for line in full_text if line.strip()]
+        stripped.replace("|", "") if "|" in stripped else stripped
+        for line in full_text
+        if (stripped := line.strip())
     )
 
 
-def process_and_insert_quotes(
-    client: MilvusClient,
-    model: SentenceTransformer,
-    student_name: str,
-    quotes_data: dict,
+def _safe_build(build, kind: str, json_file_path: Path):
+    """在工作进程中解析单个文件，失败时记录日志并返回 None，不影响其他文件。"""
+    try:
+        return build(json_file_path)
+    except Exception as e:
+        logger.error(f"处理{kind} '{json_file_path.stem}' 时失败: {e}")
+        return None
+
+
+def _truncate_utf8(text: str, max_bytes: int) -> str:
+    """按 UTF-8 字节数截断字符串，不会截断在多字节字符的中间。"""
+    # 每个字符最多占 4 字节，字符数足够少时无需编码
+    if len(text) * 4 <= max_bytes:
+        return text
+    encoded = text.encode()
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode(errors="ignore")
+
+
+def encode_and_insert(
+    client: "MilvusClient",
+    model: "SentenceTransformer",
+    collection_name: str,
+    vector_field: str,
+    payloads: list[Payload],
+    max_lengths: dict[str, int] | None = None,
 ):
-    """处理并插入单个学生的所有台词。"""
+    """为所有待插入数据批量生成向量，并分块插入到指定集合中。
+
+    每块数据编码完成后立即提交到后台线程插入，下一块的编码与上一块的 insert RPC 并行进行。
+
+    Args:
+        client (MilvusClient): Milvus 客户端实例。
+        model (SentenceTransformer): 句向量模型。
+        collection_name (str): 集合名称。
+        vector_field (str): 向量字段名称。
+        payloads (list[Payload]): (数据行, 用于生成向量的文本) 列表。
+        max_lengths (dict[str, int] | None, optional): VARCHAR 字段（或字符串数组字段的元素）
+            的最大字节数，超出的字符串在插入前截断。默认为 None，不截断。
+    """
 
-    if not quotes_data:
+    if not payloads:
+        logger.warning(f"没有可插入 '{collection_name}' 集合的数据。")
         return
 
-    quotes_to_insert = []
+    logger.info(f"正在为 '{collection_name}' 集合的 {len(payloads)} 条数据生成向量...")
+    # 模型只看前 max_seq_length 个 token，超出部分分词后也会被丢弃。
+    # 先按字符截断，省去长文本的分词开销；model.encode 内部会按长度排序分批，减少填充
+    max_chars = model.max_seq_length * MAX_CHARS_PER_TOKEN
+    # 重复的文本（如简短的台词、相同的条目内容）只编码一次，inverse 记录每行对应的去重文本
+    unique_texts: dict[str, int] = {}
+    inverse = [
+        unique_texts.setdefault(text[:max_chars], len(unique_texts))
+        for _, text in payloads
+    ]
+    if len(unique_texts) < len(payloads):
+        logger.info(
+            f"'{collection_name}' 集合中有 {len(payloads) - len(unique_texts)} 条重复文本，将复用其向量。"
+        )
+    texts = list(unique_texts)
+
+    # 编码结果转换为向量字段的存储精度（VECTOR_PRECISION）后写入预分配的矩阵，
+    # 直接使用矩阵的行作为向量，避免为每个向量构造 Python 浮点数列表
+    vectors: np.ndarray | None = None
+    encoded = 0
+    inserts = []
+    with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as pool:
+        for start in range(0, len(payloads), INSERT_BATCH_SIZE):
+            chunk_inverse = inverse[start : start + INSERT_BATCH_SIZE]
+            # 去重文本按首次出现的顺序编号，本块用到的编号都小于 needed，只需编码到此为止
+            needed = max(chunk_inverse) + 1
+            if needed > encoded:
+                block = model.encode(
+                    texts[encoded:needed],
+                    batch_size=ENCODE_BATCH_SIZE,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                )
+                if vectors is None:
+                    vectors = np.empty(
+                        (len(texts), block.shape[1]), dtype=VECTOR_NUMPY_DTYPE
+                    )
+                vectors[encoded:needed] = block
+                encoded = needed
+
+            chunk = []
+            for (row, _), index in zip(
+                payloads[start : start + INSERT_BATCH_SIZE], chunk_inverse
+            ):
+                if max_lengths:
+                    for key, limit in max_lengths.items():
+                        value = row.get(key)
+                        if isinstance(value, str):
+                            row[key] = _truncate_utf8(value, limit)
+                        elif isinstance(value, list):
+                            # 字符串数组字段逐个截断元素
+                            row[key] = [_truncate_utf8(v, limit) for v in value]
+                # 没有扩展属性的数据写入空对象
+                row.setdefault(META_FIELD, {})
+                row[vector_field] = vectors[index]
+                chunk.append(row)
+            # 每块一次 RPC，在后台线程中执行，主线程继续编码下一块
+            future = pool.submit(
+                client.insert, collection_name=collection_name, data=chunk
+            )
+            inserts.append((start, len(chunk), future))
+
+    # 某一块失败不影响其余数据
+    inserted = 0
+    for start, size, future in inserts:
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(
+                f"向 '{collection_name}' 集合插入第 {start}-{start + size} 行数据时失败: {e}"
+            )
+            continue
+        inserted += size
+    logger.info(f"成功向 '{collection_name}' 集合插入 {inserted} 条数据。")
+
+
+def build_quote_payloads(student_name: str, quotes_data: dict) -> list[Payload]:
+    """整理单个学生的所有台词。"""
+
+    quotes = []
     for version, lines in quotes_data.items():
         if not isinstance(lines, list):
             continue
@@ -52,36 +213,21 @@ def process_and_insert_quotes(
             if not cleaned_line:
                 continue
 
-            # 生成向量
-            vector = model.encode(cleaned_line, convert_to_tensor=False).tolist()
-            quotes_to_insert.append(
-                {
-                    "student_name": student_name,
-                    "version": version,
-                    "quote_text": cleaned_line,
-                    "quote_vector": vector,
-                }
-            )
-
-    if quotes_to_insert:
-        try:
-            result = client.insert(
-                collection_name="student_quotes", data=quotes_to_insert
+            quotes.append(
+                (
+                    {
+                        "student_name": student_name,
+                        "version": version,
+                        "quote_text": cleaned_line,
+                    },
+                    cleaned_line,
+                )
             )
-            logger.info(
-                f"为学生 '{student_name}' 成功插入 {len(quotes_to_insert)} 条台词, IDs: {result['ids']}"
-            )
-        except Exception as e:
-            logger.error(f"为学生 '{student_name}' 插入台词时失败: {e}")
+    return quotes
 
 
-def process_and_insert_relations(
-    client: MilvusClient,
-    model: SentenceTransformer,
-    student_name: str,
-    profile_data: dict,
-):
-    """处理并插入单个学生的人物关系。"""
+def build_relation_payloads(student_name: str, profile_data: dict) -> list[Payload]:
+    """整理单个学生的人物关系。"""
     related_persons_list = profile_data.get("相关人物_list", [])
     # 如果列表为空，则尝试解析字符串
     if not related_persons_list:
@@ -91,233 +237,206 @@ def process_and_insert_relations(
                 name.strip() for name in related_persons_str.split(",")
             ]
 
-    if not related_persons_list:
-        return
-
     # 使用学生的所属团体作为关系类型的代理
     relation_type = profile_data.get("所属团体", "未知关系")
 
-    relations_to_insert = []
+    relations = []
     for related_name in related_persons_list:
         if not related_name:
             continue
 
-        # 创建一个描述性句子用于生成向量
-        embedding_text = f"{student_name}与{related_name}的关系是{relation_type}。"
-        vector = model.encode(embedding_text, convert_to_tensor=False).tolist()
-
-        relations_to_insert.append(
-            {
-                "student_name": student_name,
-                "related_student_name": related_name,
-                "relation_type": relation_type,
-                "relation_vector": vector,
-            }
-        )
-
-    if relations_to_insert:
-        try:
-            result = client.insert(
-                collection_name="student_relations", data=relations_to_insert
-            )
-            logger.info(
-                f"为学生 '{student_name}' 成功插入 {len(relations_to_insert)} 条人物关系, IDs: {result['ids']}"
+        relations.append(
+            (
+                {
+                    "student_name": student_name,
+                    "related_student_name": related_name,
+                    "relation_type": relation_type,
+                },
+                # 创建一个描述性句子用于生成向量
+                f"{student_name}与{related_name}的关系是{relation_type}。",
             )
-        except Exception as e:
-            logger.error(f"为学生 '{student_name}' 插入人物关系时失败: {e}")
+        )
+    return relations
 
 
-def process_and_insert_student(
-    client: MilvusClient, model: SentenceTransformer, json_file_path: Path
-):
+def build_student_payloads(
+    json_file_path: Path,
+) -> tuple[Payload, list[Payload], list[Payload]]:
     """
-    处理单个学生的JSON数据文件，生成嵌入向量，并插入到'students'集合中。
+    解析单个学生的JSON数据文件，整理出学生、台词和人物关系三类待插入数据。
     """
 
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        student_profile = data.get("学生档案", {})
-
-        # 提取和组合数据字段
-        name = student_profile.get("译名", json_file_path.stem)
-        affiliation_string = student_profile.get("所属团体", "")
-        school_map = {
-            "三一": "三一综合学园",
-            "格赫娜": "格赫娜学园",
-            "千年": "千年科学学园",
-            "阿拜多斯": "阿拜多斯高中",
-            "赤冬": "赤冬联邦学园",
-            "山海经": "山海经高级中学",
-            "瓦尔基里": "瓦尔基里警察学校",
-            "SRT": "SRT特殊学园",
-            "百鬼夜行": "百鬼夜行联合学园",
-            "阿里乌斯": "阿里乌斯分校",
-        }
-        school = "未知"  # 默认值
-        for keyword, full_name in school_map.items():
-            if keyword in affiliation_string:
-                school = full_name
-                break
-        aliases = student_profile.get("别号", "")
-        tags = student_profile.get("萌点", "")
-        related_students = ", ".join(student_profile.get("related_persons_list", []))
-
-        profile_text = "\n".join([f"{k}: {v}" for k, v in student_profile.items()])
-        introduction_text = _format_text_from_sections(data, ["简介", "人物设定"])
-        experience_text = _format_text_from_sections(data, ["人物经历", "角色相关"])
-
-        # 为嵌入生成一段全面的文本
-        embedding_text = (
-            f"姓名: {name}\n"
-            f"简介: {introduction_text}\n"
-            f"经历: {experience_text}\n"
-            f"档案: {profile_text}"
-        )
+    data = orjson.loads(json_file_path.read_bytes())
 
-        # 生成向量
-        vector = model.encode(embedding_text, convert_to_tensor=False).tolist()
-
-        # 准备插入数据 (注意截断以符合schema长度限制)
-        student_data = {
-            "name": name,
-            "school": school,
-            "aliases": aliases,
-            "profile": profile_text[:1024],
-            "introduction": introduction_text[:2048],
-            "experience": experience_text[:4096],
-            "tags": tags[:512],
-            "related_students": related_students[:256],
-            "vector": vector,
-        }
-
-        # 插入数据
-        student_insert_result = client.insert(
-            collection_name="students", data=student_data
-        )
-        logger.info(f"成功插入学生: {name}, IDs: {student_insert_result['ids']}")
-
-        # 处理并插入台词
-        quotes_data = data.get("角色台词", {})
-        process_and_insert_quotes(client, model, name, quotes_data)
+    student_profile = data.get("学生档案", {})
 
-        # 处理并插入人物关系
-        process_and_insert_relations(client, model, name, student_profile)
-
-        return student_insert_result
+    # 提取和组合数据字段
+    name = student_profile.get("译名", json_file_path.stem)
+    affiliation_string = student_profile.get("所属团体", "")
+    # 一次扫描找出所属团体中出现的所有学校关键词，多个关键词时按 SCHOOL_MAP 的顺序取第一个
+    # （如“阿里乌斯特殊小队→三一补课部”应归为三一），而不是取最左边的匹配
+    matches = set(SCHOOL_PATTERN.findall(affiliation_string))
+    school = next(
+        (full_name for keyword, full_name in SCHOOL_MAP.items() if keyword in matches),
+        "未知",
+    )
+    aliases = student_profile.get("别号", "")
+    tags = student_profile.get("萌点", "")
+    related_students = student_profile.get("相关人物_list", [])[:MAX_RELATED_STUDENTS]
+    voice_actor = student_profile.get("声优", "")
+
+    # 列表字段（如相关人物）以逗号拼接后写入档案文本。
+    # 旧的数据文件同时有拼接好的字符串和 _list 列表，只保留列表，避免同一行重复出现
+    profile_text = "\n".join(
+        [
+            f"{k.removesuffix('_list')}: {','.join(v)}"
+            if isinstance(v, list)
+            else f"{k}: {v}"
+            for k, v in student_profile.items()
+            if f"{k}_list" not in student_profile
+        ]
+    )
+    introduction_text = _format_text_from_sections(data, ["简介", "人物设定"])
+    experience_text = _format_text_from_sections(data, ["人物经历", "角色相关"])
+
+    # 为嵌入生成一段全面的文本
+    embedding_text = (
+        f"姓名: {name}\n"
+        f"简介: {introduction_text}\n"
+        f"经历: {experience_text}\n"
+        f"档案: {profile_text}"
+    )
 
-    except Exception as e:
-        logger.error(f"处理或插入学生 '{json_file_path.stem}' 时失败: {e}")
-        return None
+    # 准备插入数据 (插入时按 schema 的长度限制截断)
+    student_data = {
+        "name": name,
+        "school": school,
+        "aliases": aliases,
+        "profile": profile_text,
+        "introduction": introduction_text,
+        "experience": experience_text,
+        "tags": tags,
+        "related_students": related_students,
+        META_FIELD: {"voice_actor": voice_actor} if voice_actor else {},
+    }
+
+    quotes = build_quote_payloads(name, data.get("角色台词", {}))
+    relations = build_relation_payloads(name, student_profile)
+    return (student_data, embedding_text), quotes, relations
+
+
+def collect_student_payloads(
+    student_files: list[Path],
+) -> tuple[list[Payload], list[Payload], list[Payload]]:
+    """解析所有学生文件，汇总学生、台词和人物关系三类待插入数据。
+
+    JSON 解析和文本拼接是纯 CPU 计算，在多个进程中并行完成；结果按文件顺序返回。
+    """
 
+    students, quotes, relations = [], [], []
+    with ProcessPoolExecutor(mp_context=PARSE_MP_CONTEXT) as pool:
+        results = pool.map(
+            partial(_safe_build, build_student_payloads, "学生"),
+            student_files,
+            chunksize=PARSE_CHUNK_SIZE,
+        )
+        results = [result for result in results if result is not None]
+    for student, student_quotes, student_relations in results:
+        students.append(student)
+        quotes.extend(student_quotes)
+        relations.extend(student_relations)
+    return students, quotes, relations
 
-def process_and_insert_clubs(
-    client: MilvusClient, model: SentenceTransformer, school_name: str, clubs_data: list
-):
-    """从学校数据中提取社团信息，并插入到'clubs'集合中。"""
 
-    if not clubs_data:
-        return
+def build_club_payloads(school_name: str, clubs_data: list) -> list[Payload]:
+    """从学校数据中提取社团信息。"""
 
-    clubs_to_insert = []
+    clubs = []
     for club_section in clubs_data:
         if not isinstance(club_section, dict) or "sub_title" not in club_section:
             continue
 
         club_name = club_section.get("sub_title", "").strip()
         content_list = club_section.get("content", [])
-        content_list = [content for content in content_list if content.find("|") == -1]
+        content_list = [content for content in content_list if "|" not in content]
 
         if not club_name or not content_list:
             continue
 
-        # 将描述内容列表合并为单个字符串
+        # 将描述内容列表合并为单个字符串，每项只转换和 strip 一次
         description_text = "\n".join(
-            [str(item).strip() for item in content_list if str(item).strip()]
+            stripped for item in content_list if (stripped := str(item).strip())
         )
 
-        # 为嵌入生成文本
-        embedding_text = (
-            f"学校: {school_name}\n社团: {club_name}\n描述: {description_text}"
-        )
-        vector = model.encode(embedding_text, convert_to_tensor=False).tolist()
-
-        clubs_to_insert.append(
-            {
-                "name": club_name,
-                "school": school_name,
-                "description": description_text[:2048],  # 安全截断以符合schema
-                "vector": vector,
-            }
-        )
-
-    if clubs_to_insert:
-        try:
-            result = client.insert(collection_name="clubs", data=clubs_to_insert)
-            logger.info(
-                f"为学校 '{school_name}' 成功插入 {len(clubs_to_insert)} 个社团, IDs: {result['ids']}"
+        clubs.append(
+            (
+                {
+                    "name": club_name,
+                    "school": school_name,
+                    "description": description_text,
+                },
+                # 为嵌入生成文本
+                f"学校: {school_name}\n社团: {club_name}\n描述: {description_text}",
             )
-        except Exception as e:
-            logger.error(f"为学校 '{school_name}' 插入社团时失败: {e}")
-
-
-def process_and_insert_school(
-    client: MilvusClient, model: SentenceTransformer, json_file_path: Path
-):
-    """处理单个学校的JSON数据文件，生成嵌入向量，并插入到'schools'集合中。"""
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # 提取和组合数据字段
-        basic_info_dict = data.get("基本资料", {})
-        name = basic_info_dict.get("学校名称", json_file_path.stem)
-
-        # 使用辅助函数格式化各个文本部分
-        basic_info_text = "\n".join([f"{k}: {v}" for k, v in basic_info_dict.items()])
-        introduction_text = _format_text_from_sections(data, ["简介"])
-        facilities_text = _format_text_from_sections(data, ["校内设施"])
-        students_and_clubs_text = _format_text_from_sections(data, ["学生与社团"])
-        history_text = _format_text_from_sections(data, ["历史"])
-        overview_text = _format_text_from_sections(data, ["概况"])
-
-        # 为嵌入生成一段全面的文本
-        embedding_text = (
-            f"学校名称: {name}\n"
-            f"基本资料: {basic_info_text}\n"
-            f"简介: {introduction_text}\n"
-            f"设施: {facilities_text}\n"
-            f"学生与社团: {students_and_clubs_text}\n"
-            f"历史与概况: {history_text}\n{overview_text}"
         )
+    return clubs
+
+
+def build_school_payloads(json_file_path: Path) -> tuple[Payload, list[Payload]]:
+    """解析单个学校的JSON数据文件，整理出学校和社团两类待插入数据。"""
+    data = orjson.loads(json_file_path.read_bytes())
+
+    # 提取和组合数据字段
+    basic_info_dict = data.get("基本资料", {})
+    name = basic_info_dict.get("学校名称", json_file_path.stem)
+
+    # 使用辅助函数格式化各个文本部分
+    basic_info_text = "\n".join([f"{k}: {v}" for k, v in basic_info_dict.items()])
+    introduction_text = _format_text_from_sections(data, ["简介"])
+    facilities_text = _format_text_from_sections(data, ["校内设施"])
+    students_and_clubs_text = _format_text_from_sections(data, ["学生与社团"])
+    history_text = _format_text_from_sections(data, ["历史"])
+    overview_text = _format_text_from_sections(data, ["概况"])
+
+    # 为嵌入生成一段全面的文本
+    embedding_text = (
+        f"学校名称: {name}\n"
+        f"基本资料: {basic_info_text}\n"
+        f"简介: {introduction_text}\n"
+        f"设施: {facilities_text}\n"
+        f"学生与社团: {students_and_clubs_text}\n"
+        f"历史与概况: {history_text}\n{overview_text}"
+    )
 
-        # 生成向量
-        vector = model.encode(embedding_text, convert_to_tensor=False).tolist()
-
-        # 准备插入数据 (使用切片进行安全截断)
-        school_data = {
-            "name": name[:64],
-            "basic_info": basic_info_text[:1024],
-            "introduction": introduction_text[:4096],
-            "facilities": facilities_text[:2048],
-            "students_and_clubs": students_and_clubs_text[:8192],
-            "history": history_text[:4096],
-            "overview": overview_text[:4096],
-            "vector": vector,
-        }
-
-        # 插入数据
-        school_insert_result = client.insert(
-            collection_name="schools", data=school_data
+    # 准备插入数据 (插入时按 schema 的长度限制截断)
+    school_data = {
+        "name": name,
+        "basic_info": basic_info_text,
+        "introduction": introduction_text,
+        "facilities": facilities_text,
+        "students_and_clubs": students_and_clubs_text,
+        "history": history_text,
+        "overview": overview_text,
+    }
+
+    clubs = build_club_payloads(name, data.get("学生与社团", []))
+    return (school_data, embedding_text), clubs
+
+
+def collect_school_payloads(
+    school_files: list[Path],
+) -> tuple[list[Payload], list[Payload]]:
+    """解析所有学校文件，汇总学校和社团两类待插入数据，解析在多个进程中并行完成。"""
+
+    schools, clubs = [], []
+    with ProcessPoolExecutor(mp_context=PARSE_MP_CONTEXT) as pool:
+        results = pool.map(
+            partial(_safe_build, build_school_payloads, "学校"),
+            school_files,
+            chunksize=PARSE_CHUNK_SIZE,
         )
-        logger.info(f"成功插入学校: {name}, IDs: {school_insert_result['ids']}")
-
-        club_data = data.get("学生与社团", [])
-        process_and_insert_clubs(client, model, name, club_data)
-
-        return school_insert_result
-
-    except Exception as e:
-        logger.error(f"处理或插入学校 '{json_file_path.stem}' 时失败: {e}")
-        return None
+        results = [result for result in results if result is not None]
+    for school, school_clubs in results:
+        schools.append(school)
+        clubs.extend(school_clubs)
+    return schools, clubs
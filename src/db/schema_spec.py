@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+
+from pymilvus import DataType
+
+from ..core.config import VECTOR_DIM
+from ..core.precision import VECTOR_DATA_TYPE
+
+# VARCHAR 字段的 max_length 按 UTF-8 字节计算（一个汉字占 3 字节），
+# 取语料中该字段最大长度之上的下一个 2 的幂，超出部分在插入前按字节截断。
+# max_length 不小于 4096 的长文本字段只在返回结果时读取，开启 mmap 按需从磁盘分页加载，
+# 把内存留给向量索引；向量字段保持常驻内存
+
+# 每个学生最多记录的相关学生数量
+MAX_RELATED_STUDENTS = 32
+
+# 各集合共有的 JSON 扩展字段。以后新增的零散属性（如声优）写入其中，
+# 无需再为每个属性增加 VARCHAR 字段并重建集合
+META_FIELD = "meta"
+
+# 稀疏向量字段，由服务端的 BM25 函数根据文本字段生成，写入时无需提供。
+# 与稠密向量混合搜索，弥补稠密向量对人名、学校简称等少见词的召回不足
+SPARSE_FIELD = "sparse_vector"
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """集合中一个字段的定义，由 schemas 转换为 pymilvus 的 FieldSchema。
+
+    只有显式设置的参数才会传给 FieldSchema。
+    """
+
+    name: str
+    dtype: DataType
+    description: str
+    # VARCHAR 字段（或 VARCHAR 数组的元素）的最大字节数
+    max_length: int | None = None
+    # 主键，由服务端自动分配
+    is_pk: bool = False
+    partition_key: bool = False
+    # 标量索引类型，如 "INVERTED"、"BITMAP"
+    index: str | None = None
+    mmap: bool = False
+    # 开启中文分词和词项匹配
+    analyzer: bool = False
+    element_type: DataType | None = None
+    max_capacity: int | None = None
+    dim: int | None = None
+    nullable: bool = False
+
+
+def _primary(name: str, description: str) -> FieldSpec:
+    """INT64 主键字段，由服务端自动分配，插入的数据中不包含主键。"""
+    return FieldSpec(name, DataType.INT64, description, is_pk=True)
+
+
+def _varchar(name: str, max_length: int, description: str, **kwargs) -> FieldSpec:
+    """VARCHAR 字段，max_length 按 UTF-8 字节计算。"""
+    return FieldSpec(name, DataType.VARCHAR, description, max_length, **kwargs)
+
+
+def _long_text(name: str, max_length: int, description: str) -> FieldSpec:
+    """长文本字段：开启分词匹配，并使用 mmap 按需从磁盘加载。"""
+    return _varchar(name, max_length, description, analyzer=True, mmap=True)
+
+
+def _meta() -> FieldSpec:
+    """可为空的 JSON 扩展字段。"""
+    return FieldSpec(
+        META_FIELD,
+        DataType.JSON,
+        "扩展属性，如 {'voice_actor': ...}",
+        nullable=True,
+    )
+
+
+def _vector(name: str, description: str) -> FieldSpec:
+    """句向量字段，精度由 VECTOR_PRECISION 决定。"""
+    return FieldSpec(name, VECTOR_DATA_TYPE, description, dim=VECTOR_DIM)
+
+
+def _sparse() -> FieldSpec:
+    """BM25 稀疏向量字段。"""
+    return FieldSpec(SPARSE_FIELD, DataType.SPARSE_FLOAT_VECTOR, "BM25 稀疏向量")
+
+
+# 各集合的字段定义。用作过滤条件的标量字段声明了索引类型，过滤时无需逐行扫描：
+# 取值很少的字段（学校、台词版本、信息分类）使用 BITMAP，多个条件可直接按位与；
+# 相关学生数组的元素只有一百个左右的学生姓名，也使用 BITMAP，
+# ARRAY_CONTAINS_ANY 的多个值直接按位或；其余字段使用 INVERTED
+SCHEMAS: dict[str, list[FieldSpec]] = {
+    "students": [
+        _primary("student_id", "学生ID"),
+        _varchar("name", 64, "学生姓名", index="INVERTED"),
+        _varchar("school", 64, "学校名称", index="BITMAP"),
+        _varchar("aliases", 256, "学生别名", analyzer=True),
+        _varchar("profile", 2048, "学生档案", analyzer=True),
+        _long_text("introduction", 8192, "学生介绍"),
+        _long_text("experience", 16384, "学生经历"),
+        _varchar("tags", 512, "学生标签", analyzer=True, index="INVERTED"),
+        FieldSpec(
+            "related_students",
+            DataType.ARRAY,
+            "相关学生姓名列表",
+            max_length=64,
+            index="BITMAP",
+            element_type=DataType.VARCHAR,
+            max_capacity=MAX_RELATED_STUDENTS,
+        ),
+        _meta(),
+        _vector("vector", "学生向量表示"),
+        _sparse(),
+    ],
+    "student_quotes": [
+        _primary("quote_id", "台词ID"),
+        _varchar(
+            "student_name",
+            64,
+            "关联的学生姓名 (分区键)",
+            partition_key=True,
+            index="INVERTED",
+        ),
+        _varchar("version", 32, "台词版本，如'原始','新年'", index="BITMAP"),
+        _varchar("quote_text", 1024, "台词内容", analyzer=True),
+        _meta(),
+        _vector("quote_vector", "台词向量表示"),
+    ],
+    "student_relations": [
+        _primary("relation_id", "关系ID"),
+        _varchar(
+            "student_name",
+            64,
+            "学生姓名 (分区键)",
+            partition_key=True,
+            index="INVERTED",
+        ),
+        _varchar("related_student_name", 64, "相关学生姓名", index="INVERTED"),
+        _varchar("relation_type", 64, "关系类型，如'便利屋68'", index="INVERTED"),
+        _meta(),
+        _vector("relation_vector", "关系向量表示"),
+    ],
+    "schools": [
+        _primary("school_id", "学校ID"),
+        _varchar("name", 128, "学校名称", index="INVERTED"),
+        _varchar("basic_info", 512, "基本资料"),
+        _long_text("introduction", 4096, "学校简介"),
+        _varchar("facilities", 2048, "校内设施", analyzer=True),
+        _long_text("students_and_clubs", 16384, "学生与社团信息"),
+        _long_text("history", 4096, "学校历史"),
+        _varchar("overview", 2048, "学校概况", analyzer=True),
+        _meta(),
+        _vector("vector", "学校文本向量"),
+    ],
+    "clubs": [
+        _primary("club_id", "社团ID"),
+        _varchar("name", 64, "社团名称", index="INVERTED"),
+        _varchar("school", 128, "所属学校", index="BITMAP"),
+        _varchar("description", 2048, "社团描述", analyzer=True),
+        _meta(),
+        _vector("vector", "社团描述的向量"),
+    ],
+    "game_basic_info": [
+        _primary("info_id", "游戏信息ID"),
+        _varchar(
+            "category",
+            64,
+            "信息类别，如'背景设定','游戏系统' (分区键)",
+            partition_key=True,
+            index="BITMAP",
+        ),
+        _varchar("title", 128, "条目标题", index="INVERTED"),
+        _long_text("content", 8192, "条目内容"),
+        _meta(),
+        _vector("vector", "内容向量"),
+        _sparse(),
+    ],
+}
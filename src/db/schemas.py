@@ -1,228 +1,183 @@
-from pymilvus import DataType, FieldSchema
-
-from ..core.config import VECTOR_DIM
-
-student_fields = [
-    FieldSchema(
-        name="student_id",
-        dtype=DataType.INT64,
-        is_primary=True,
-        description="学生ID",
-    ),
-    FieldSchema(
-        name="name", dtype=DataType.VARCHAR, max_length=64, description="学生姓名"
-    ),
-    FieldSchema(
-        name="school", dtype=DataType.VARCHAR, max_length=64, description="学校名称"
-    ),
-    FieldSchema(
-        name="aliases", dtype=DataType.VARCHAR, max_length=256, description="学生别名"
-    ),
-    FieldSchema(
-        name="profile", dtype=DataType.VARCHAR, max_length=2048, description="学生档案"
-    ),
-    FieldSchema(
-        name="introduction",
-        dtype=DataType.VARCHAR,
-        max_length=8192,
-        description="学生介绍",
-    ),
-    FieldSchema(
-        name="experience",
-        dtype=DataType.VARCHAR,
-        max_length=16384,
-        description="学生经历",
-    ),
-    FieldSchema(
-        name="tags", dtype=DataType.VARCHAR, max_length=512, description="学生标签"
-    ),
-    FieldSchema(
-        name="related_students",
-        dtype=DataType.VARCHAR,
-        max_length=256,
-        description="相关学生列表 (逗号分隔)",
-    ),
-    FieldSchema(
-        name="vector",
-        dtype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
-        description="学生向量表示",
-    ),
-]
-
-quote_fields = [
-    FieldSchema(
-        name="quote_id",
-        dtype=DataType.INT64,
-        is_primary=True,
-        description="台词ID",
-    ),
-    FieldSchema(
-        name="student_name",
-        dtype=DataType.VARCHAR,
-        max_length=64,
-        description="关联的学生姓名",
-    ),
-    FieldSchema(
-        name="version",
-        dtype=DataType.VARCHAR,
-        max_length=32,
-        description="台词版本，如'原始','新年'",
-    ),
-    FieldSchema(
-        name="quote_text",
-        dtype=DataType.VARCHAR,
-        max_length=1024,
-        description="台词内容",
-    ),
-    FieldSchema(
-        name="quote_vector",
-        dtype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
-        description="台词向量表示",
-    ),
-]
-
-relation_fields = [
-    FieldSchema(
-        name="relation_id",
-        dtype=DataType.INT64,
-        is_primary=True,
-        description="关系ID",
-    ),
-    FieldSchema(
-        name="student_name",
-        dtype=DataType.VARCHAR,
-        max_length=64,
-        description="学生姓名",
-    ),
-    FieldSchema(
-        name="related_student_name",
-        dtype=DataType.VARCHAR,
-        max_length=64,
-        description="相关学生姓名",
-    ),
-    FieldSchema(
-        name="relation_type",
-        dtype=DataType.VARCHAR,
-        max_length=64,
-        description="关系类型，如'便利屋68'",
-    ),
-    FieldSchema(
-        name="relation_vector",
-        dtype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
-        description="关系向量表示",
-    ),
-]
-
-school_fields = [
-    FieldSchema(
-        name="school_id",
-        dtype=DataType.INT64,
-        is_primary=True,
-        description="学校ID",
-    ),
-    FieldSchema(
-        name="name", dtype=DataType.VARCHAR, max_length=128, description="学校名称"
-    ),
-    FieldSchema(
-        name="basic_info",
-        dtype=DataType.VARCHAR,
-        max_length=1024,
-        description="基本资料",
-    ),
-    FieldSchema(
-        name="introduction",
-        dtype=DataType.VARCHAR,
-        max_length=4096,
-        description="学校简介",
-    ),
-    FieldSchema(
-        name="facilities",
-        dtype=DataType.VARCHAR,
-        max_length=2048,
-        description="校内设施",
-    ),
-    FieldSchema(
-        name="students_and_clubs",
-        dtype=DataType.VARCHAR,
-        max_length=16384,
-        description="学生与社团信息",
-    ),
-    FieldSchema(
-        name="history",
-        dtype=DataType.VARCHAR,
-        max_length=4096,
-        description="学校历史",
-    ),
-    FieldSchema(
-        name="overview",
-        dtype=DataType.VARCHAR,
-        max_length=4096,
-        description="学校概况",
-    ),
-    FieldSchema(
-        name="vector",
-        dtype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
-        description="学校文本向量",
-    ),
-]
-
-club_fields = [
-    FieldSchema(
-        name="club_id",
-        dtype=DataType.INT64,
-        is_primary=True,
-        description="社团ID",
-    ),
-    FieldSchema(
-        name="name", dtype=DataType.VARCHAR, max_length=64, description="社团名称"
-    ),
-    FieldSchema(
-        name="school", dtype=DataType.VARCHAR, max_length=128, description="所属学校"
-    ),
-    FieldSchema(
-        name="description",
-        dtype=DataType.VARCHAR,
-        max_length=8192,
-        description="社团描述",
-    ),
-    FieldSchema(
-        name="vector",
-        dtype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
-        description="社团描述的向量",
-    ),
-]
-
-game_basic_info_fields = [
-    FieldSchema(
-        name="info_id",
-        dtype=DataType.INT64,
-        is_primary=True,
-        description="游戏信息ID",
-    ),
-    FieldSchema(
-        name="category",
-        dtype=DataType.VARCHAR,
-        max_length=64,
-        description="信息类别，如'背景设定','游戏系统'",
-    ),
-    FieldSchema(
-        name="title", dtype=DataType.VARCHAR, max_length=128, description="条目标题"
-    ),
-    FieldSchema(
-        name="content",
-        dtype=DataType.VARCHAR,
-        max_length=65535,
-        description="条目内容",
-    ),
-    FieldSchema(
-        name="vector",
-        dtype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
-        description="内容向量",
-    ),
-]
+from collections.abc import Iterable
+from functools import lru_cache
+
+from pymilvus import CollectionSchema, DataType, FieldSchema, Function, FunctionType
+
+from .schema_spec import SCHEMAS, SPARSE_FIELD, FieldSpec
+
+# 声明 analyzer 的字段（长文本以及标签、别号）开启中文分词和词项匹配，
+# 服务端为其建立分词倒排索引，可以使用 TEXT_MATCH 过滤而无需逐行扫描
+TEXT_MATCH_PARAMS = {
+    "enable_analyzer": True,
+    "enable_match": True,
+    "analyzer_params": {"type": "chinese"},
+}
+
+# 使用 BM25 稀疏向量的集合及其输入文本字段（需开启分词）。
+# 学生档案中包含译名、别号和所属团体，游戏基本信息使用条目内容
+BM25_INPUT_FIELDS: dict[str, str] = {
+    "students": "profile",
+    "game_basic_info": "content",
+}
+
+# 各集合的描述
+COLLECTION_DESCRIPTIONS: dict[str, str] = {
+    "students": "学生信息集合",
+    "student_quotes": "学生名言集合",
+    "student_relations": "学生关系集合",
+    "schools": "学校信息集合",
+    "clubs": "社团信息集合",
+    "game_basic_info": "游戏基本信息集合",
+}
+
+
+def _materialize(spec: FieldSpec) -> FieldSchema:
+    """将字段定义转换为 FieldSchema，只传入显式设置的参数（pymilvus 不接受很多参数为 None）。"""
+    kwargs = {}
+    if spec.is_pk:
+        kwargs["is_primary"] = True
+        kwargs["auto_id"] = True
+    if spec.partition_key:
+        kwargs["is_partition_key"] = True
+    if spec.element_type is not None:
+        kwargs["element_type"] = spec.element_type
+    if spec.max_capacity is not None:
+        kwargs["max_capacity"] = spec.max_capacity
+    if spec.max_length is not None:
+        kwargs["max_length"] = spec.max_length
+    if spec.dim is not None:
+        kwargs["dim"] = spec.dim
+    if spec.nullable:
+        kwargs["nullable"] = True
+    if spec.analyzer:
+        kwargs.update(TEXT_MATCH_PARAMS)
+    if spec.mmap:
+        kwargs["mmap_enabled"] = True
+    return FieldSchema(
+        name=spec.name, dtype=spec.dtype, description=spec.description, **kwargs
+    )
+
+
+@lru_cache(maxsize=None)
+def build_fields(collection_name: str) -> tuple[FieldSchema, ...]:
+    """按 schema_spec.SCHEMAS 中的定义构建集合的字段，每个集合只构建一次。"""
+    return tuple(_materialize(spec) for spec in SCHEMAS[collection_name])
+
+
+# 旧版按集合导出的字段列表名称，保留以兼容外部代码，访问时才由 build_fields 构建
+_LEGACY_FIELD_NAMES: dict[str, str] = {
+    "student_fields": "students",
+    "quote_fields": "student_quotes",
+    "relation_fields": "student_relations",
+    "school_fields": "schools",
+    "club_fields": "clubs",
+    "game_basic_info_fields": "game_basic_info",
+}
+
+
+def __getattr__(name: str) -> list[FieldSchema]:
+    """兼容旧名称 student_fields 等，返回对应集合的字段列表。"""
+    if name in _LEGACY_FIELD_NAMES:
+        return list(build_fields(_LEGACY_FIELD_NAMES[name]))
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=None)
+def build_schema(collection_name: str) -> CollectionSchema:
+    """构建集合结构，每个集合只构建一次，之后重建集合时直接复用。
+
+    开启动态字段，写入时 schema 之外的键也会保存，而不是报错。
+    BM25_INPUT_FIELDS 中的集合附带 BM25 函数，由服务端生成稀疏向量。
+    不在模块导入时预先构建，只导入常量的模块（如数据处理的子进程）无需承担构建开销。
+    """
+    functions = None
+    if collection_name in BM25_INPUT_FIELDS:
+        functions = [
+            Function(
+                name=f"{collection_name}_bm25",
+                function_type=FunctionType.BM25,
+                input_field_names=[BM25_INPUT_FIELDS[collection_name]],
+                output_field_names=[SPARSE_FIELD],
+            )
+        ]
+    return CollectionSchema(
+        fields=list(build_fields(collection_name)),
+        description=COLLECTION_DESCRIPTIONS.get(collection_name, ""),
+        functions=functions,
+        enable_dynamic_field=True,
+    )
+
+
+def hnsw_index_params(m: int, ef_construction: int, sq_type: str | None = None) -> dict:
+    """构建向量字段的 HNSW 索引参数。
+
+    度量方式与搜索接口保持一致 (L2)。M 越大图的连通性越好、召回率越高，但内存和构建时间也越多。
+    指定 sq_type（如 "SQ8"）时使用 HNSW_SQ，图中的向量经标量量化后存储，索引内存更小。
+    """
+    params = {"M": m, "efConstruction": ef_construction}
+    if sq_type:
+        return {
+            "index_type": "HNSW_SQ",
+            "metric_type": "L2",
+            "params": {**params, "sq_type": sq_type},
+        }
+    return {"index_type": "HNSW", "metric_type": "L2", "params": params}
+
+
+# 各集合向量字段的索引参数，按集合的数据量选择：
+# 台词和游戏基本信息有数千条数据，使用更大的 M/efConstruction，并以 SQ8 量化减少索引内存；
+# 其余集合只有几十到几百条，量化的收益抵不过其开销，使用普通 HNSW
+student_index_params = hnsw_index_params(16, 64)
+quote_index_params = hnsw_index_params(24, 128, sq_type="SQ8")
+relation_index_params = hnsw_index_params(16, 64)
+school_index_params = hnsw_index_params(16, 64)
+club_index_params = hnsw_index_params(16, 64)
+game_basic_info_index_params = hnsw_index_params(24, 128, sq_type="SQ8")
+
+# BM25 稀疏向量字段的索引参数
+bm25_index_params = {"index_type": "SPARSE_INVERTED_INDEX", "metric_type": "BM25"}
+
+
+def scalar_index_params(collection_name: str) -> list[tuple[str, str]]:
+    """返回集合中声明了标量索引的字段及其索引类型。"""
+    return [
+        (spec.name, spec.index)
+        for spec in SCHEMAS[collection_name]
+        if spec.index is not None
+    ]
+
+
+# 各集合用作过滤条件的标量字段的索引参数，索引类型在 schema_spec 中随字段声明
+student_scalar_index_params = scalar_index_params("students")
+quote_scalar_index_params = scalar_index_params("student_quotes")
+relation_scalar_index_params = scalar_index_params("student_relations")
+school_scalar_index_params = scalar_index_params("schools")
+club_scalar_index_params = scalar_index_params("clubs")
+game_basic_info_scalar_index_params = scalar_index_params("game_basic_info")
+
+# 各集合的一致性级别。数据在构建时一次性写入、之后很少变化，
+# 使用 Eventually 搜索时无需等待时间戳同步；关系集合保持默认的 Bounded
+CONSISTENCY_LEVELS: dict[str, str] = {
+    "students": "Eventually",
+    "student_quotes": "Eventually",
+    "student_relations": "Bounded",
+    "schools": "Eventually",
+    "clubs": "Eventually",
+    "game_basic_info": "Eventually",
+}
+
+# JSON 扩展字段中常用于过滤的键及其类型，为其建立 JSON 路径索引，
+# 如 meta['voice_actor'] == 'X' 的过滤条件无需逐行解析 JSON
+JSON_PATH_INDEX_PARAMS: dict[str, list[tuple[str, str]]] = {
+    "students": [("voice_actor", "varchar")],
+}
+
+
+def varchar_max_lengths(fields: Iterable[FieldSchema]) -> dict[str, int]:
+    """返回集合中各 VARCHAR 字段（以及 VARCHAR 数组字段的元素）的 max_length（字节数）。"""
+    return {
+        field.name: field.params["max_length"]
+        for field in fields
+        if field.dtype == DataType.VARCHAR
+        or (field.dtype == DataType.ARRAY and field.element_type == DataType.VARCHAR)
+    }
@@ -0,0 +1,27 @@
+import pytest
+
+from src.api.endpoint import build_filter_expression
+
+
+def test_json_key_filter():
+    """JSON 扩展字段的键转换为 meta["key"] 访问，可以使用 JSON 路径索引。"""
+    expected = 'meta["voice_actor"] == "春花兰"'
+    assert build_filter_expression({"meta.voice_actor": "春花兰"}) == expected
+    assert build_filter_expression({'meta["voice_actor"]': "春花兰"}) == expected
+
+
+def test_json_key_filter_with_other_conditions():
+    assert (
+        build_filter_expression(
+            {"school": "三一综合学园", "meta.voice_actor": ["A", "B"]}
+        )
+        == 'school == "三一综合学园" and meta["voice_actor"] in ["A","B"]'
+    )
+
+
+@pytest.mark.parametrize(
+    "key", ["meta.voice actor", 'meta["a"] or 1', "meta.a.b", "1 == 1 or name"]
+)
+def test_invalid_filter_key(key):
+    with pytest.raises(ValueError):
+        build_filter_expression({key: "x"})